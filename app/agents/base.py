@@ -0,0 +1,63 @@
+# agents/base.py
+
+import asyncio
+import logging
+
+try:
+    from ..ollama_client import agenerate
+    from ..config_loader import get_agent_prompt, get_agent_parameters
+except ImportError:
+    # Fallback for when running as standalone
+    import sys
+    from pathlib import Path
+    sys.path.append(str(Path(__file__).parent.parent))
+    from ollama_client import agenerate
+    from config_loader import get_agent_prompt, get_agent_parameters
+
+logger = logging.getLogger(__name__)
+
+class Agent:
+    """Pipeline agent driven by its entry in the agents section of the YAML config"""
+    
+    def __init__(self, key, name, role):
+        self.key = key
+        self.name = name
+        self.role = role
+    
+    def _config(self):
+        # Both lookups are memoized in config_loader and cleared by reload_config()
+        return get_agent_prompt(self.key), get_agent_parameters(self.key)
+    
+    async def arun(self, prompt, model, shared_prefix=""):
+        """Run the agent; shared_prefix is placed before the system prompt (e.g. context
+        common to every agent of a run, so Ollama can reuse its prefilled KV cache)"""
+        logger.debug("%s.arun() called: model=%s prompt_len=%d", self.key, model, len(prompt))
+        
+        try:
+            system_prompt, parameters = self._config()
+            result = await agenerate(prompt, system_prompt=shared_prefix + system_prompt, model=model, **parameters)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s completed: result_len=%d preview=%r", self.key, len(result), result[:100])
+            
+            return result
+            
+        except Exception as e:
+            logger.exception("%s.arun() failed: %s", self.key, e)
+            raise
+    
+    async def aprefill(self, model, shared_prefix=""):
+        """Warm Ollama's prompt cache with this agent's system prompt ahead of its turn
+        
+        Every request of this agent starts with the same system prompt, so Ollama can
+        reuse the prefilled prefix when the real request arrives. Generates one token.
+        """
+        try:
+            system_prompt, parameters = self._config()
+            # Same options as arun(): a different num_ctx would make Ollama reload the model
+            await agenerate("", system_prompt=shared_prefix + system_prompt, model=model,
+                            **{**parameters, "num_predict": 1})
+        except Exception as e:
+            logger.debug("%s.aprefill() failed: %s", self.key, e)
+    
+    def run(self, prompt, model, shared_prefix=""):
+        return asyncio.run(self.arun(prompt, model, shared_prefix=shared_prefix))
@@ -1,24 +1,12 @@
 # agents/critique.py
 
 try:
-    from ..ollama_client import generate
-    from ..config_loader import get_agent_prompt, get_agent_parameters
+    from .base import Agent
 except ImportError:
     # Fallback for when running as standalone
     import sys
     from pathlib import Path
-    sys.path.append(str(Path(__file__).parent.parent))
-    from ollama_client import generate
-    from config_loader import get_agent_prompt, get_agent_parameters
+    sys.path.append(str(Path(__file__).parent))
+    from base import Agent
 
-class CritiqueAgent:
-    name = "Critique Agent"
-    role = "Research Framework Reviewer"
-    
-    @staticmethod
-    def run(prompt, model):
-        # Get system prompt and parameters from YAML config
-        system_prompt = get_agent_prompt('critique')
-        parameters = get_agent_parameters('critique')
-        
-        return generate(prompt, system_prompt=system_prompt, model=model, **parameters)
+CritiqueAgent = Agent("critique", name="Critique Agent", role="Research Framework Reviewer")
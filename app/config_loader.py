@@ -5,40 +5,75 @@ Loads agent configurations, pipeline settings, and model parameters from YAML fi
 
 import yaml
 import os
-from typing import Dict, Any, Optional, List
+import pickle
+import logging
+import threading
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Mapping
 from pathlib import Path
 
+# Prefer libyaml's C loader; fall back to the pure-Python one when PyYAML was built without it
+try:
+    from yaml import CSafeLoader as _Loader
+    LIBYAML_AVAILABLE = True
+except ImportError:
+    from yaml import SafeLoader as _Loader
+    LIBYAML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that points at the configuration file
+CONFIG_PATH_ENV = "RAG_CONFIG_PATH"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
 class ConfigLoader:
     """Loads and manages configuration from YAML files"""
     
     def __init__(self, config_path: str = "config/agents.yaml"):
-        # Try multiple possible paths for the config file
-        possible_paths = [
-            Path(config_path),  # Relative to current working directory
-            Path(__file__).parent.parent / config_path,  # Relative to this file
-            Path.cwd() / config_path,  # Relative to current working directory
-            Path.home() / "Desktop" / "test llm" / config_path,  # Absolute fallback
-        ]
-        
-        self.config_path = None
-        for path in possible_paths:
-            if path.exists():
-                self.config_path = path
-                break
-        
-        if not self.config_path:
-            raise FileNotFoundError(f"Configuration file not found. Tried: {[str(p) for p in possible_paths]}")
+        # RAG_CONFIG_PATH wins; otherwise resolve relative to the project root
+        env_path = os.environ.get(CONFIG_PATH_ENV)
+        self.config_path = Path(env_path) if env_path else PROJECT_ROOT / config_path
+        
+        if not self.config_path.exists():
+            raise FileNotFoundError(f"Configuration file not found: {self.config_path}")
         
         self.config = self._load_config()
         
-    def _load_config(self) -> Dict[str, Any]:
-        """Load configuration from YAML file"""
+    def _load_config(self, use_cache: bool = True) -> Dict[str, Any]:
+        """Load configuration from YAML file, reusing a pickled copy while the YAML is unchanged
+        
+        The pickle records the YAML's mtime and is only used when it matches exactly, so
+        edits, and older files copied over the YAML, are both picked up.
+        """
+        cache_path = self.config_path.with_suffix('.yaml.pkl')
+        yaml_mtime = self.config_path.stat().st_mtime_ns
+        if use_cache:
+            try:
+                with open(cache_path, 'rb') as cache_file:
+                    cached = pickle.load(cache_file)
+                if isinstance(cached, dict) and cached.get("mtime") == yaml_mtime:
+                    return cached["data"]
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+                pass
+        
         with open(self.config_path, 'r', encoding='utf-8') as file:
             try:
-                config = yaml.safe_load(file)
-                return config
+                config = yaml.load(file, Loader=_Loader)
             except yaml.YAMLError as e:
                 raise ValueError(f"Invalid YAML configuration: {e}")
+        
+        # Write the cache atomically so concurrent readers never see a partial pickle
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as cache_file:
+                pickle.dump({"mtime": yaml_mtime, "data": config}, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # Read-only config directory: just skip caching
+            pass
+        
+        return config
     
     def get_agent_config(self, agent_name: str) -> Dict[str, Any]:
         """Get configuration for a specific agent"""
@@ -103,13 +138,19 @@ class ConfigLoader:
         return output_config.get('default_template', 'academic')
     
     def reload_config(self) -> None:
-        """Reload configuration from file"""
-        self.config = self._load_config()
+        """Reload configuration from file (always re-parses the YAML and refreshes the pickle)"""
+        self.config = self._load_config(use_cache=False)
+        # Drop the module-level memoized agent lookups so they see the new config
+        get_agent_prompt.cache_clear()
+        get_agent_parameters.cache_clear()
     
     def validate_config(self) -> List[str]:
         """Validate configuration and return list of errors"""
         errors = []
         
+        if not LIBYAML_AVAILABLE:
+            logger.warning("PyYAML was built without libyaml; falling back to the slower pure-Python loader")
+        
         # Check required sections
         required_sections = ['agents', 'pipeline', 'models']
         for section in required_sections:
@@ -152,33 +193,48 @@ class ConfigLoader:
         global_config = self.get_global_config()
         return global_config.get('default_model', 'gemma3:4b')
 
-# Global configuration instance
-config_loader = ConfigLoader()
+# Global configuration instance, created on first use
+_config_loader: Optional[ConfigLoader] = None
+_config_loader_lock = threading.Lock()
+
+def _get() -> ConfigLoader:
+    """Return the global configuration loader, creating it on first call"""
+    global _config_loader
+    if _config_loader is None:
+        with _config_loader_lock:
+            if _config_loader is None:
+                _config_loader = ConfigLoader()
+    return _config_loader
 
 def get_config() -> ConfigLoader:
     """Get the global configuration loader instance"""
-    return config_loader
+    return _get()
 
 def reload_config() -> None:
     """Reload the global configuration"""
-    config_loader.reload_config()
+    _get().reload_config()
 
 def get_agent_config(agent_name: str) -> Dict[str, Any]:
     """Get configuration for a specific agent"""
-    return config_loader.get_agent_config(agent_name)
+    return _get().get_agent_config(agent_name)
 
+@lru_cache(maxsize=64)
 def get_agent_prompt(agent_name: str) -> str:
-    """Get the system prompt for a specific agent"""
-    return config_loader.get_agent_prompt(agent_name)
+    """Get the system prompt for a specific agent (memoized until reload_config)"""
+    return _get().get_agent_prompt(agent_name)
+
+@lru_cache(maxsize=64)
+def get_agent_parameters(agent_name: str) -> Mapping[str, Any]:
+    """Get the LLM parameters for a specific agent (memoized until reload_config)
 
-def get_agent_parameters(agent_name: str) -> Dict[str, Any]:
-    """Get the LLM parameters for a specific agent"""
-    return config_loader.get_agent_parameters(agent_name)
+    The result is shared between callers, so it is returned as a read-only mapping.
+    """
+    return MappingProxyType(dict(_get().get_agent_parameters(agent_name)))
 
 def get_pipeline_steps() -> List[Dict[str, Any]]:
     """Get the pipeline configuration steps"""
-    return config_loader.get_pipeline_steps()
+    return _get().get_pipeline_steps()
 
 def get_model_config(model_name: str) -> Dict[str, Any]:
     """Get configuration for a specific model"""
-    return config_loader.get_model_config(model_name)
+    return _get().get_model_config(model_name)
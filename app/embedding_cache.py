@@ -0,0 +1,59 @@
+"""
+Embedding cache for AI Research Assistant
+In-process LRU caches of query and chunk embeddings, so repeated text skips the embedding model
+"""
+
+import hashlib
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .response_cache import LRUCache
+except ImportError:
+    # Fallback for when running as standalone
+    from response_cache import LRUCache
+
+class LRUEmbeddingCache(LRUCache):
+    """LRU+TTL cache of embeddings keyed by sha256 of (model, text)
+
+    Vectors are stored as float32, the precision every embedding backend produces,
+    so a cache hit returns the same vector as the call that computed it.
+    """
+
+    def __init__(self, capacity: int = 10000, ttl: float = 3600):
+        super().__init__(capacity=capacity, ttl=ttl)
+
+    @staticmethod
+    def _key(text: str, model: str) -> bytes:
+        return hashlib.sha256(f"{model}\0{text}".encode()).digest()
+
+    def get(self, text: str, model: str) -> Optional[List[float]]:
+        """Return the cached embedding of text under model, or None"""
+        vec = super().get(self._key(text, model))
+        return None if vec is None else vec.tolist()
+
+    def put(self, text: str, model: str, vec: Sequence[float]) -> None:
+        """Cache the embedding of text under model"""
+        super().put(self._key(text, model), np.asarray(vec, dtype=np.float32))
+
+    def embed_batch(self, texts: Sequence[str], model: str,
+                    embed_fn: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """Embed texts, calling embed_fn once for the distinct texts that aren't cached"""
+        results = [self.get(text, model) for text in texts]
+        misses = [i for i, vec in enumerate(results) if vec is None]
+        if misses:
+            unique = list(dict.fromkeys(texts[i] for i in misses))
+            computed = dict(zip(unique, embed_fn(unique)))
+            for text, vec in computed.items():
+                self.put(text, model, vec)
+            for i in misses:
+                results[i] = computed[texts[i]]
+        return results
+
+# Shared by every retrieval path in the process
+embedding_cache = LRUEmbeddingCache()
+
+# Chunk embeddings computed while building the index. The indexing worker process
+# outlives each job, so an upload or delete rebuild only embeds chunks whose text changed.
+chunk_embedding_cache = LRUEmbeddingCache(capacity=20000, ttl=24 * 3600)
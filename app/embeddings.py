@@ -0,0 +1,174 @@
+"""
+Embedding backends for AI Research Assistant
+Selects and builds the embedding model used to index and query documents
+"""
+
+import os
+from pathlib import Path
+from typing import List
+
+import requests
+
+try:
+    from .ollama_client import OLLAMA_URL
+except ImportError:
+    # Fallback for when running as standalone
+    from ollama_client import OLLAMA_URL
+
+try:
+    from llama_index.embeddings import LangchainEmbedding
+    from llama_index.embeddings.base import BaseEmbedding
+    from llama_index.bridge.pydantic import Field, PrivateAttr
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    LLAMA_INDEX_AVAILABLE = True
+except ImportError:
+    LLAMA_INDEX_AVAILABLE = False
+
+try:
+    import numpy as np
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# "huggingface" embeds in-process with sentence-transformers,
+# "onnx" runs the int8-quantized ONNX export of the same model,
+# "ollama" sends batches to the Ollama server's /api/embed endpoint,
+# "auto" uses the ONNX model when it has been exported, else huggingface
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "auto")
+HF_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_EMBED_MODEL_PATH = os.getenv(
+    "ONNX_EMBED_MODEL_PATH",
+    str(Path(__file__).parent.parent / "models" / "all-MiniLM-L6-v2-onnx-int8" / "model_quantized.onnx"),
+)
+# all-minilm is the Ollama build of all-MiniLM-L6-v2 (same 384-dim space)
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "all-minilm")
+# Texts embedded per model call / request; unset keeps each backend's default
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "0")) or None
+
+# Keep-alive session so consecutive /api/embed batches reuse the connection
+_SESSION = requests.Session()
+
+
+if LLAMA_INDEX_AVAILABLE:
+    class OllamaBatchEmbedding(BaseEmbedding):
+        """Embed texts in batches with a single /api/embed request per batch"""
+
+        base_url: str = Field(default=OLLAMA_URL, description="Ollama server URL")
+        timeout: float = Field(default=60, description="Request timeout in seconds")
+
+        @classmethod
+        def class_name(cls) -> str:
+            return "OllamaBatchEmbedding"
+
+        def _embed(self, texts: List[str]) -> List[List[float]]:
+            resp = _SESSION.post(
+                f"{self.base_url}/api/embed",
+                json={"model": self.model_name, "input": texts},
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            return resp.json()["embeddings"]
+
+        def _get_query_embedding(self, query: str) -> List[float]:
+            return self._embed([query])[0]
+
+        async def _aget_query_embedding(self, query: str) -> List[float]:
+            return self._get_query_embedding(query)
+
+        def _get_text_embedding(self, text: str) -> List[float]:
+            return self._embed([text])[0]
+
+        def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+            return self._embed(texts)
+
+
+if LLAMA_INDEX_AVAILABLE and ONNX_AVAILABLE:
+    class OnnxMiniLMEmbedding(BaseEmbedding):
+        """all-MiniLM-L6-v2 served from an int8-quantized ONNX Runtime session"""
+
+        model_path: str = Field(description="Path to the quantized .onnx model")
+        max_length: int = Field(default=256, description="Maximum tokens per text")
+
+        _session = PrivateAttr()
+        _tokenizer = PrivateAttr()
+        _input_names = PrivateAttr()
+
+        def __init__(self, model_path: str, **kwargs):
+            super().__init__(model_path=model_path, **kwargs)
+
+            sess_options = ort.SessionOptions()
+            sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            available = ort.get_available_providers()
+            providers = [p for p in ["CUDAExecutionProvider", "CPUExecutionProvider"] if p in available]
+
+            self._session = ort.InferenceSession(model_path, sess_options=sess_options, providers=providers)
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._input_names = [i.name for i in self._session.get_inputs()]
+
+        @classmethod
+        def class_name(cls) -> str:
+            return "OnnxMiniLMEmbedding"
+
+        def _embed(self, texts: List[str]) -> List[List[float]]:
+            encoded = self._tokenizer(
+                texts,
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self._input_names}
+            last_hidden_state = self._session.run(None, feeds)[0]
+
+            # Mean-pool over real tokens, then L2-normalize like sentence-transformers
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            return pooled.tolist()
+
+        def _get_query_embedding(self, query: str) -> List[float]:
+            return self._embed([query])[0]
+
+        async def _aget_query_embedding(self, query: str) -> List[float]:
+            return self._get_query_embedding(query)
+
+        def _get_text_embedding(self, text: str) -> List[float]:
+            return self._embed([text])[0]
+
+        def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+            return self._embed(texts)
+
+
+def _resolve_backend() -> str:
+    """Resolve "auto" to a concrete backend"""
+    if EMBED_BACKEND != "auto":
+        return EMBED_BACKEND
+    if ONNX_AVAILABLE and os.path.exists(ONNX_EMBED_MODEL_PATH):
+        return "onnx"
+    return "huggingface"
+
+
+def make_embed_model(device: str = "cpu"):
+    """Build the embedding model for the configured EMBED_BACKEND"""
+    backend = _resolve_backend()
+    batch_kwargs = {"embed_batch_size": EMBED_BATCH_SIZE} if EMBED_BATCH_SIZE else {}
+
+    if backend == "onnx":
+        return OnnxMiniLMEmbedding(model_path=ONNX_EMBED_MODEL_PATH, model_name=HF_EMBED_MODEL, **batch_kwargs)
+
+    if backend == "ollama":
+        # Larger batches amortize the HTTP round-trip when Ollama runs on a GPU
+        return OllamaBatchEmbedding(
+            model_name=OLLAMA_EMBED_MODEL,
+            embed_batch_size=EMBED_BATCH_SIZE or (128 if device == "cuda" else 32),
+        )
+
+    return LangchainEmbedding(
+        HuggingFaceEmbeddings(
+            model_name=HF_EMBED_MODEL,
+            model_kwargs={"device": device}
+        ),
+        **batch_kwargs
+    )
@@ -4,6 +4,11 @@ Handles document processing, vector indexing, and semantic search
 """
 
 import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functools import lru_cache
 from typing import List, Dict, Any
 from pathlib import Path
 
@@ -15,33 +20,255 @@ try:
         ServiceContext,
         StorageContext,
         load_index_from_storage,
+        QueryBundle,
     )
-    from llama_index.embeddings import LangchainEmbedding
-    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from llama_index.schema import NodeWithScore, MetadataMode
+    from llama_index.ingestion import IngestionPipeline
     LLAMA_INDEX_AVAILABLE = True
 except ImportError:
     LLAMA_INDEX_AVAILABLE = False
     print("Warning: LlamaIndex not available. Document indexing will not work.")
 
+try:
+    import torch
+    _HAS_TORCH = True
+except ImportError:
+    _HAS_TORCH = False
+
+try:
+    import faiss
+    from llama_index.vector_stores import FaissVectorStore
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+try:
+    from .embeddings import make_embed_model
+    from .embedding_cache import embedding_cache, chunk_embedding_cache
+    from .semantic_cache import SemanticCache
+except ImportError:
+    # Fallback for when running as standalone
+    from embeddings import make_embed_model
+    from embedding_cache import embedding_cache, chunk_embedding_cache
+    from semantic_cache import SemanticCache
+
 DOCS_DIR = os.getenv("DOCS_DIR", "data/docs")
 INDEX_DIR = os.getenv("INDEX_DIR", "data/index")
 
+# Lower-cased suffixes of the document types that get indexed
+DOC_EXTENSIONS = frozenset({'.pdf', '.txt', '.md', '.docx'})
+PDF_EXTENSIONS = frozenset({'.pdf'})
+
+# Number of documents parsed and embedded together while building the index
+DOC_BATCH_SIZE = 16
+
+# Worker processes that parse and embed shards of the documents in parallel while
+# building the index; each loads its own embedding model, so 1 (in-process) by default
+INDEX_WORKERS = max(1, int(os.getenv("INDEX_WORKERS", "1")))
+
+# Vector store backing the index: "simple" (LlamaIndex's in-memory store, supports
+# deleting a document's vectors) or "faiss" (HNSW graph, sub-linear search on large
+# corpora, but deletes fall back to a full rebuild). Changing it rebuilds the index.
+VECTOR_STORE = os.getenv("VECTOR_STORE", "simple").lower()
+USE_FAISS = FAISS_AVAILABLE and VECTOR_STORE == "faiss"
+
+# Device for local embedding models, probed once at import
+DEVICE = "cuda" if _HAS_TORCH and torch.cuda.is_available() else "cpu"
+
+def _has_extension(name, extensions):
+    return os.path.splitext(name)[1].lower() in extensions
+
+def _scan_documents(docs_dir, extensions=DOC_EXTENSIONS):
+    """Regular files in docs_dir with one of the given extensions, as DirEntry objects
+
+    DirEntry caches the type and stat information, so each file costs one syscall at most.
+    """
+    with os.scandir(docs_dir) as it:
+        return [entry for entry in it if _has_extension(entry.name, extensions) and entry.is_file()]
+
+# Index loaded by get_index(), reused until the index is rebuilt or cleared
+_CACHED_INDEX = None
+_INDEX_LOCK = threading.RLock()
+
+# Top-k node ids per similarity_top_k, looked up by query-embedding proximity so
+# a query close to an earlier one skips the vector search
+_RETRIEVAL_CACHES: Dict[int, "SemanticCache"] = {}
+
+def _retrieval_cache(k):
+    return _RETRIEVAL_CACHES.setdefault(k, SemanticCache(threshold=0.9, dedup_threshold=0.98, ttl=3600))
+
+def _clear_retrieval_caches():
+    for cache in _RETRIEVAL_CACHES.values():
+        cache.clear()
+
+def _set_cached_index(index):
+    global _CACHED_INDEX
+    with _INDEX_LOCK:
+        _CACHED_INDEX = index
+        _get_retriever.cache_clear()
+        _clear_retrieval_caches()
+
+def invalidate_index_cache():
+    """Drop the in-memory index so the next get_index() reloads it from disk"""
+    _set_cached_index(None)
+
+# Called instead of build_index() when get_index() finds no loadable index; the API
+# server registers one that schedules the build in its indexing worker process
+_MISSING_INDEX_HANDLER = None
+
+def set_missing_index_handler(handler):
+    """Have get_index() call handler() and return None rather than build the index in-process"""
+    global _MISSING_INDEX_HANDLER
+    _MISSING_INDEX_HANDLER = handler
+
+@lru_cache(maxsize=1)
+def get_embed_model():
+    """Shared embedding model, loaded once per process"""
+    return make_embed_model(DEVICE)
+
+@lru_cache(maxsize=1)
+def get_service_context():
+    """Shared ServiceContext wrapping the embedding model"""
+    return ServiceContext.from_defaults(embed_model=get_embed_model(), llm=None)
+
+@lru_cache(maxsize=1)
+def get_embed_dim():
+    """Dimension of the vectors produced by the embedding model"""
+    return len(get_embed_model().get_text_embedding("dimension probe"))
+
+def _new_storage_context():
+    """Storage for a new index: a FAISS HNSW graph when VECTOR_STORE=faiss, else the in-memory store"""
+    if not USE_FAISS:
+        return StorageContext.from_defaults()
+    
+    # HNSW gives sub-linear approximate search; 32 neighbours per node is FAISS' usual default
+    faiss_index = faiss.IndexHNSWFlat(get_embed_dim(), 32)
+    return StorageContext.from_defaults(vector_store=FaissVectorStore(faiss_index=faiss_index))
+
+def _load_storage_context():
+    """Storage context for the index persisted in INDEX_DIR"""
+    if not USE_FAISS:
+        return StorageContext.from_defaults(persist_dir=INDEX_DIR)
+    
+    vector_store = FaissVectorStore.from_persist_dir(INDEX_DIR)
+    return StorageContext.from_defaults(vector_store=vector_store, persist_dir=INDEX_DIR)
+
 def clean_pdf_filenames(docs_dir):
     """Clean PDF filenames for better indexing"""
     if not os.path.exists(docs_dir):
         return
     
-    for fname in os.listdir(docs_dir):
-        if fname.lower().endswith('.pdf'):
-            new_name = fname.rstrip().replace(' ', '_')
-            if new_name != fname:
-                old_path = os.path.join(docs_dir, fname)
-                new_path = os.path.join(docs_dir, new_name)
-                try:
-                    os.rename(old_path, new_path)
-                    print(f"Renamed: '{fname}' -> '{new_name}'")
-                except OSError as e:
-                    print(f"Could not rename {fname}: {e}")
+    for entry in _scan_documents(docs_dir, PDF_EXTENSIONS):
+        fname = entry.name
+        # Already-clean names (the common case after the first run) need no further work
+        if ' ' not in fname and fname == fname.rstrip():
+            continue
+        
+        new_name = fname.rstrip().replace(' ', '_')
+        new_path = os.path.join(docs_dir, new_name)
+        try:
+            os.replace(entry.path, new_path)
+            print(f"Renamed: '{fname}' -> '{new_name}'")
+        except OSError as e:
+            print(f"Could not rename {fname}: {e}")
+
+def _load_files_windowed(executor, paths, window):
+    """Yield each file's documents, parsing at most window files ahead of the consumer"""
+    for start in range(0, len(paths), window):
+        # The next window is only submitted once this one has been consumed
+        yield from executor.map(
+            lambda path: SimpleDirectoryReader(input_files=[path]).load_data(),
+            paths[start:start + window]
+        )
+
+def _iter_document_batches(target_docs_dir, specific_files=None, batch_size=DOC_BATCH_SIZE):
+    """Yield lists of loaded documents, about batch_size at a time, without loading the whole corpus"""
+    if specific_files:
+        print(f"📚 Loading specific documents: {specific_files}")
+        file_paths = [os.path.join(target_docs_dir, filename) for filename in specific_files]
+        existing = [path for path in file_paths if os.path.exists(path)]
+        
+        for filename, path in zip(specific_files, file_paths):
+            if not os.path.exists(path):
+                print(f"⚠️ File not found: {filename}")
+        
+        # Parse files on a thread pool: this overlaps file I/O, but the default PDF reader
+        # (pypdf) is pure Python and holds the GIL, so CPU-bound parsing barely overlaps
+        max_workers = min(32, (os.cpu_count() or 1) * 2)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        per_file_docs = _load_files_windowed(executor, existing, batch_size)
+    else:
+        print(f"📚 Loading all documents from {target_docs_dir}...")
+        executor = None
+        per_file_docs = SimpleDirectoryReader(target_docs_dir).iter_data()
+    
+    try:
+        batch = []
+        for docs in per_file_docs:
+            batch.extend(docs)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+def _set_source_metadata(docs):
+    """Record the source filename of each document in its metadata"""
+    for doc in docs:
+        # Try to get the filename from file_path, fallback to doc_id, fallback to any known metadata
+        filename = None
+        if hasattr(doc, "file_path") and doc.file_path:
+            filename = os.path.basename(doc.file_path)
+        elif "file_path" in doc.metadata and doc.metadata["file_path"]:
+            filename = os.path.basename(doc.metadata["file_path"])
+        elif "file_name" in doc.metadata and doc.metadata["file_name"]:
+            filename = doc.metadata["file_name"]
+        # fallback to doc_id if nothing else
+        if not filename and hasattr(doc, "doc_id"):
+            filename = str(doc.doc_id)
+        doc.metadata["source"] = filename or "Unknown"
+
+def _embed_nodes(nodes, embed_model):
+    """Set each node's embedding, embedding only chunk text that isn't cached yet"""
+    embeddings = chunk_embedding_cache.embed_batch(
+        [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes],
+        embed_model.model_name,
+        embed_model.get_text_embedding_batch
+    )
+    for node, embedding in zip(nodes, embeddings):
+        node.embedding = embedding
+
+def _embed_shard(docs_dir, filenames):
+    """Worker: load, parse and embed one shard of the documents; returns (nodes, document count)"""
+    service_context = get_service_context()
+    pipeline = IngestionPipeline(transformations=[service_context.node_parser])
+    
+    nodes, doc_count = [], 0
+    for doc_batch in _iter_document_batches(docs_dir, filenames):
+        _set_source_metadata(doc_batch)
+        batch_nodes = pipeline.run(documents=doc_batch)
+        _embed_nodes(batch_nodes, service_context.embed_model)
+        nodes.extend(batch_nodes)
+        doc_count += len(doc_batch)
+    return nodes, doc_count
+
+def _iter_sharded_nodes(target_docs_dir, specific_files, workers):
+    """Yield (embedded nodes, document count) per shard as the worker processes finish"""
+    if specific_files:
+        filenames = list(specific_files)
+    else:
+        with os.scandir(target_docs_dir) as it:
+            filenames = sorted(e.name for e in it if e.is_file() and not e.name.startswith("."))
+    
+    shards = [filenames[i::workers] for i in range(workers) if filenames[i::workers]]
+    print(f"🧩 Embedding {len(filenames)} files in {len(shards)} worker processes...")
+    with ProcessPoolExecutor(max_workers=len(shards) or 1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_embed_shard, target_docs_dir, shard) for shard in shards]
+        for future in as_completed(futures):
+            yield future.result()
 
 def build_index(docs_dir=None, specific_files=None):
     """Build vector index from documents in DOCS_DIR or specific files"""
@@ -60,66 +287,47 @@ def build_index(docs_dir=None, specific_files=None):
         # Clean PDF filenames
         clean_pdf_filenames(target_docs_dir)
         
-        # Load documents - either all or specific files
-        if specific_files:
-            print(f"📚 Loading specific documents: {specific_files}")
-            docs = []
-            for filename in specific_files:
-                file_path = os.path.join(target_docs_dir, filename)
-                if os.path.exists(file_path):
-                    # Load single document
-                    single_docs = SimpleDirectoryReader(input_files=[file_path]).load_data()
-                    docs.extend(single_docs)
-                else:
-                    print(f"⚠️ File not found: {filename}")
-        else:
-            print(f"📚 Loading all documents from {target_docs_dir}...")
-            docs = SimpleDirectoryReader(target_docs_dir).load_data()
-        
-        if not docs:
-            print("❌ No documents found")
-            return None
-        
-        print(f"✅ Loaded {len(docs)} documents")
-        
-        # Process document metadata
-        for doc in docs:
-            # Try to get the filename from file_path, fallback to doc_id, fallback to any known metadata
-            filename = None
-            if hasattr(doc, "file_path") and doc.file_path:
-                filename = os.path.basename(doc.file_path)
-            elif "file_path" in doc.metadata and doc.metadata["file_path"]:
-                filename = os.path.basename(doc.metadata["file_path"])
-            elif "file_name" in doc.metadata and doc.metadata["file_name"]:
-                filename = doc.metadata["file_name"]
-            # fallback to doc_id if nothing else
-            if not filename and hasattr(doc, "doc_id"):
-                filename = str(doc.doc_id)
-            doc.metadata["source"] = filename or "Unknown"
-        
         # Set up embedding model
         print("🔧 Setting up embedding model...")
         
         # Suppress the device info message
-        import logging
         logging.getLogger("sentence_transformers.SentenceTransformer").setLevel(logging.WARNING)
         
-        # Explicitly specify device
-        import torch
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"📱 Using device: {device}")
+        print(f"📱 Using device: {DEVICE}")
+        service_context = get_service_context()
         
-        embed_model = LangchainEmbedding(
-            HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={"device": device}
-            )
+        # Documents are parsed into nodes and embedded batch by batch, so only one
+        # batch of documents is held in memory at a time
+        print("🏗️ Building vector index...")
+        index = VectorStoreIndex(
+            nodes=[],
+            service_context=service_context,
+            storage_context=_new_storage_context()
         )
-        service_context = ServiceContext.from_defaults(embed_model=embed_model, llm=None)
+        pipeline = IngestionPipeline(transformations=[service_context.node_parser])
         
-        # Create and persist index
-        print("🏗️ Building vector index...")
-        index = VectorStoreIndex.from_documents(docs, service_context=service_context)
+        total_docs = 0
+        if INDEX_WORKERS > 1:
+            # Nodes arrive already embedded, so inserting them only adds them to the stores
+            for nodes, doc_count in _iter_sharded_nodes(target_docs_dir, specific_files, INDEX_WORKERS):
+                index.insert_nodes(nodes)
+                total_docs += doc_count
+                print(f"📄 Indexed {total_docs} documents...")
+        else:
+            for doc_batch in _iter_document_batches(target_docs_dir, specific_files):
+                _set_source_metadata(doc_batch)
+                nodes = pipeline.run(documents=doc_batch)
+                # Pre-embedded nodes are only added to the stores by insert_nodes
+                _embed_nodes(nodes, service_context.embed_model)
+                index.insert_nodes(nodes)
+                total_docs += len(doc_batch)
+                print(f"📄 Indexed {total_docs} documents...")
+        
+        if not total_docs:
+            print("❌ No documents found")
+            return None
+        
+        print(f"✅ Loaded {total_docs} documents")
         
         # Ensure index directory exists
         os.makedirs(INDEX_DIR, exist_ok=True)
@@ -127,6 +335,7 @@ def build_index(docs_dir=None, specific_files=None):
         # Persist index
         index.storage_context.persist(INDEX_DIR)
         print(f"✅ Vector index built and persisted → {INDEX_DIR}")
+        _set_cached_index(index)
         
         return index
         
@@ -136,6 +345,10 @@ def build_index(docs_dir=None, specific_files=None):
         traceback.print_exc()
         return None
 
+def build_index_job(docs_dir=None, specific_files=None):
+    """build_index() for a worker process: reports success instead of returning the index"""
+    return build_index(docs_dir=docs_dir, specific_files=specific_files) is not None
+
 def remove_document_from_index(filename):
     """Remove a specific document from the index"""
     if not LLAMA_INDEX_AVAILABLE:
@@ -151,15 +364,25 @@ def remove_document_from_index(filename):
             print("❌ No index available for document removal")
             return False
         
-        # For now, we'll rebuild the index without the specific file
-        # This is a simple approach - in production you might want more sophisticated removal
-        print(f"🔄 Rebuilding index without '{filename}'...")
+        # Drop only the documents that came from this file
+        ref_doc_ids = {
+            node.ref_doc_id
+            for node in index.docstore.docs.values()
+            if node.metadata.get("source") == filename and node.ref_doc_id
+        }
+        try:
+            for ref_doc_id in ref_doc_ids:
+                index.delete_ref_doc(ref_doc_id, delete_from_docstore=True)
+            index.storage_context.persist(INDEX_DIR)
+            _clear_retrieval_caches()
+            print(f"✅ Removed {len(ref_doc_ids)} document(s) for '{filename}' from index")
+            return True
+        except NotImplementedError:
+            # Vector store backend does not support deletes, fall back to a rebuild
+            print(f"🔄 Rebuilding index without '{filename}'...")
         
         # Get list of all files except the one to remove
-        all_files = []
-        for fname in os.listdir(DOCS_DIR):
-            if fname != filename and fname.lower().endswith(('.pdf', '.txt', '.md', '.docx')):
-                all_files.append(fname)
+        all_files = [entry.name for entry in _scan_documents(DOCS_DIR) if entry.name != filename]
         
         if not all_files:
             print("⚠️ No files left after removal, clearing index")
@@ -167,11 +390,13 @@ def remove_document_from_index(filename):
             import shutil
             if os.path.exists(INDEX_DIR):
                 shutil.rmtree(INDEX_DIR)
+            invalidate_index_cache()
             return True
         
-        # Rebuild index with remaining files
+        # Rebuild index with remaining files (the removed file may still be on disk)
         print(f"📚 Rebuilding index with {len(all_files)} remaining files...")
-        build_index()
+        if build_index(specific_files=all_files) is None:
+            return False
         
         print(f"✅ Successfully removed '{filename}' from index")
         return True
@@ -183,37 +408,52 @@ def remove_document_from_index(filename):
         return False
 
 def get_index():
-    """Get the existing index or build a new one if needed"""
+    """Get the cached index, loading the existing one or building a new one if needed"""
     if not LLAMA_INDEX_AVAILABLE:
         print("❌ LlamaIndex not available. Cannot load index.")
         return None
     
-    if not os.path.exists(INDEX_DIR):
-        print(f"📚 Index not found at {INDEX_DIR}, building new index...")
-        return build_index()
-    
-    try:
-        print(f"📚 Loading existing index from {INDEX_DIR}...")
-        storage_context = StorageContext.from_defaults(persist_dir=INDEX_DIR)
-        # Explicitly specify device
-        import torch
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+    global _CACHED_INDEX
+    with _INDEX_LOCK:
+        if _CACHED_INDEX is not None:
+            return _CACHED_INDEX
         
-        embed_model = LangchainEmbedding(
-            HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={"device": device}
-            )
-        )
-        service_context = ServiceContext.from_defaults(embed_model=embed_model, llm=None)
-        index = load_index_from_storage(storage_context, service_context=service_context)
-        print("✅ Index loaded successfully")
-        return index
+        if not os.path.exists(INDEX_DIR):
+            print(f"📚 Index not found at {INDEX_DIR}, building new index...")
+            return _build_missing_index()
         
-    except Exception as e:
-        print(f"❌ Error loading index: {e}")
-        print("🔄 Rebuilding index...")
+        try:
+            print(f"📚 Loading existing index from {INDEX_DIR}...")
+            index = load_index_from_storage(_load_storage_context(), service_context=get_service_context())
+            print("✅ Index loaded successfully")
+            _CACHED_INDEX = index
+            return index
+            
+        except Exception as e:
+            print(f"❌ Error loading index: {e}")
+            print("🔄 Rebuilding index...")
+            return _build_missing_index()
+
+def _build_missing_index():
+    """Build the index here, or hand the build to the registered missing-index handler"""
+    if _MISSING_INDEX_HANDLER is None:
         return build_index()
+    _MISSING_INDEX_HANDLER()
+    return None
+
+@lru_cache(maxsize=8)
+def _get_retriever(k: int):
+    """Retriever over the cached index, one per similarity_top_k"""
+    return get_index().as_retriever(similarity_top_k=k)
+
+def embed_query(query: str):
+    """Embed a query, reusing the cached embedding of an identical earlier query"""
+    embed_model = get_embed_model()
+    embedding = embedding_cache.get(query, embed_model.model_name)
+    if embedding is None:
+        embedding = embed_model.get_query_embedding(query)
+        embedding_cache.put(query, embed_model.model_name, embedding)
+    return embedding
 
 def retrieve(query: str, k: int = 4):
     """Retrieve relevant passages for a query"""
@@ -228,7 +468,22 @@ def retrieve(query: str, k: int = 4):
             return []
         
         print(f"🔍 Retrieving {k} passages for query: {query[:50]}...")
-        passages = index.as_retriever(similarity_top_k=k).retrieve(query)
+        embedding = embed_query(query)
+        cache = _retrieval_cache(k)
+        
+        hits = cache.get(embedding)
+        if hits is not None:
+            try:
+                nodes = index.docstore.get_nodes([node_id for node_id, _ in hits])
+                passages = [NodeWithScore(node=node, score=score) for node, (_, score) in zip(nodes, hits)]
+                print(f"⚡ Reused {len(passages)} passages retrieved for a similar query")
+                return passages
+            except Exception:
+                # Cached nodes no longer in the docstore: search again
+                pass
+        
+        passages = _get_retriever(k).retrieve(QueryBundle(query_str=query, embedding=embedding))
+        cache.put(embedding, [(p.node.node_id, p.score) for p in passages])
         print(f"✅ Retrieved {len(passages)} passages")
         return passages
         
@@ -242,16 +497,14 @@ def get_document_info():
         return {"error": f"Documents directory not found: {DOCS_DIR}"}
     
     try:
-        files = []
-        for fname in os.listdir(DOCS_DIR):
-            if fname.lower().endswith(('.pdf', '.txt', '.md', '.docx')):
-                file_path = os.path.join(DOCS_DIR, fname)
-                file_size = os.path.getsize(file_path)
-                files.append({
-                    "name": fname,
-                    "size": file_size,
-                    "size_mb": round(file_size / (1024 * 1024), 2)
-                })
+        files = [
+            {
+                "name": entry.name,
+                "size": (file_size := entry.stat().st_size),
+                "size_mb": round(file_size / (1024 * 1024), 2)
+            }
+            for entry in _scan_documents(DOCS_DIR)
+        ]
         
         return {
             "documents_dir": DOCS_DIR,
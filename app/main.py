@@ -1,54 +1,192 @@
-from fastapi import FastAPI, Request, UploadFile, File, HTTPException
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException, BackgroundTasks
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 import os
-import shutil
+import re
+import json
+import asyncio
+import hashlib
 from pathlib import Path
-from typing import List
+import numpy as np
+import aiofiles
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, List
 import logging
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Handle imports for both relative and absolute cases
 try:
-    from .ollama_client import generate
-    from .rag import retrieve, run_pipeline, rebuild_index
-    from .indexer import build_index, remove_document_from_index
+    from .ollama_client import agenerate, generate_stream, aclose_client, warmup
+    from .config_loader import get_config
+    from .rag import retrieve, arun_pipeline, rebuild_index, clear_pipeline_cache
+    from .indexer import build_index_job, invalidate_index_cache, remove_document_from_index, set_missing_index_handler
+    from .response_cache import LRUCache
+    from .embedding_cache import embedding_cache
 except ImportError:
     # Fallback for when running as standalone
-    from ollama_client import generate
-    from rag import retrieve, run_pipeline, rebuild_index
-    from indexer import build_index, remove_document_from_index
+    from ollama_client import agenerate, generate_stream, aclose_client, warmup
+    from config_loader import get_config
+    from rag import retrieve, arun_pipeline, rebuild_index, clear_pipeline_cache
+    from indexer import build_index_job, invalidate_index_cache, remove_document_from_index, set_missing_index_handler
+    from response_cache import LRUCache
+    from embedding_cache import embedding_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Local RAG ChatGPT")
+# Responses (including the multi-KB pipeline results) are serialized with orjson when installed
+APIResponse = ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+app = FastAPI(title="Local RAG ChatGPT", default_response_class=APIResponse)
+
+# Paths are resolved once at import
+BASE_DIR = Path(__file__).resolve().parent
+DOCS_DIR = (BASE_DIR / "../data/docs").resolve()
+FRONTEND_DIR = (BASE_DIR / "../frontend").resolve()
+INDEX_DIR = (BASE_DIR / "../data/index").resolve()
+FAVICON = BASE_DIR / "favicon.png"
+INDEX_HTML = FRONTEND_DIR / "index.html"
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that sets Cache-Control on every file response
+
+    With fingerprinted=True, assets with a hex content hash in the name (e.g.
+    app.3f9a2c1d.js) never change and are cached for a year; every other file
+    gets the cache_control header.
+    """
+
+    _HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+
+    def __init__(self, *args, cache_control: str = "public, max-age=300", fingerprinted: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+        self.fingerprinted = fingerprinted
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if self.fingerprinted and self._HASHED_NAME.search(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = self.cache_control
+        return response
 
 # Serve docs as static files at /static/docs
 # This allows linking to /static/docs/<filename>
-docs_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/docs'))
-print(f"[DEBUG] Mounting /static/docs from: {docs_dir}")
-app.mount("/static/docs", StaticFiles(directory=docs_dir), name="docs")
+# (check_dir=False: the docs directory may only be created by the first upload)
+# Uploads can replace a doc under the same name, so browsers revalidate with the ETag
+print(f"[DEBUG] Mounting /static/docs from: {DOCS_DIR}")
+app.mount("/static/docs", CachedStaticFiles(directory=DOCS_DIR, check_dir=False, cache_control="no-cache"), name="docs")
 
 # Serve static files from the frontend directory at /static
-frontend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../frontend'))
-app.mount("/static", StaticFiles(directory=frontend_dir), name="static")
+app.mount("/static", CachedStaticFiles(directory=FRONTEND_DIR, check_dir=False, fingerprinted=True), name="static")
+
+# Answers to repeated chat queries; cleared whenever the document index changes
+response_cache = LRUCache(capacity=1024, ttl=3600)
+
+# File types accepted by /api/upload
+_ALLOWED_EXTS = frozenset({'.pdf', '.txt', '.doc', '.docx', '.md'})
+
+# File count/total size of the docs directory for /api/health, updated by upload and
+# delete and rescanned on /api/rebuild (files changed outside the API show up after that)
+_DOCS_STATS: Dict[str, Any] = {}
+
+# Uploads are written to disk 1 MiB at a time
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Indexing status of uploaded files ("queued", "processing", "indexed" or "failed"),
+# updated by the background indexing task
+index_jobs: Dict[str, Dict[str, Any]] = {}
+
+# Index builds (PDF parsing, chunking, embedding) run in a worker process so they
+# don't block the event loop. A single worker serializes writes to the index
+# directory; spawn avoids forking a process that holds model/thread state.
+_POOL = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+async def _run_in_pool(fn, *args, **kwargs):
+    """Run fn in the indexing worker process, then drop this process's stale in-memory index"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_POOL, partial(fn, *args, **kwargs))
+    finally:
+        invalidate_index_cache()
+        response_cache.clear()
+        clear_pipeline_cache()
+
+def _start_index_build():
+    """Build the index in the worker process, unless such a build is already running"""
+    task = getattr(app.state, "index_build_task", None)
+    if task is None or task.done():
+        logger.info("No usable index on disk, building it in the indexing worker")
+        app.state.index_build_task = asyncio.create_task(_run_in_pool(build_index_job, docs_dir=str(DOCS_DIR)))
+
+def _index_building() -> bool:
+    task = getattr(app.state, "index_build_task", None)
+    return task is not None and not task.done()
+
+@app.on_event("startup")
+async def register_missing_index_handler():
+    # Retrieval without a loadable index answers without passages while the worker builds
+    # it, so only the worker ever writes the index directory
+    loop = asyncio.get_running_loop()
+    set_missing_index_handler(lambda: loop.call_soon_threadsafe(_start_index_build))
+
+@app.on_event("startup")
+async def warmup_default_model():
+    # Load the default model in the background so the first chat doesn't pay for it;
+    # keep a reference so the task isn't garbage-collected before it finishes
+    app.state.warmup_task = asyncio.create_task(warmup(get_config().get_default_model()))
+
+@app.on_event("shutdown")
+async def close_ollama_client():
+    await aclose_client()
+
+@app.on_event("shutdown")
+def shutdown_index_pool():
+    _POOL.shutdown(wait=False, cancel_futures=True)
 
 # Serve favicon.ico from the app folder
 @app.get('/favicon.ico')
 def favicon():
-    return FileResponse(os.path.join(os.path.dirname(__file__), 'favicon.png'))
+    return FileResponse(FAVICON)
 
 # Serve index.html at root
 @app.get("/")
 def read_index():
-    return FileResponse(os.path.join(frontend_dir, "index.html"))
+    return FileResponse(INDEX_HTML)
+
+# System prompts for quick mode
+_QUICK_DIRECT_SYS = """You are a helpful AI assistant. Provide a clear, direct answer to the user's question.
+
+GUIDELINES:
+- Be direct and informative
+- Use clear, simple language
+- Focus on answering the question asked
+- Keep your response reasonable and helpful"""
+
+_QUICK_RAG_SYS_PREFIX = """You are a helpful AI assistant. Answer the user's question using the context provided below.
+
+INSTRUCTIONS:
+- Use the information from the provided context
+- Be clear and informative
+- If the context doesn't contain enough information, mention what's available
+- Provide a helpful response based on the context
+
+Context:
+"""
 
 class ChatRequest(BaseModel):
     query: str
     model: str = "gemma3:4b"  # Default to Gemma 3 4B
     mode: str = "quick"  # Add mode to request
+    stream: bool = False  # Stream quick-mode tokens as server-sent events
 
 class FileInfo(BaseModel):
     name: str
@@ -56,34 +194,78 @@ class FileInfo(BaseModel):
     modified: float  # Changed from str to float for timestamp
     type: str
 
+def _sse_data(obj) -> str:
+    """Server-sent event line carrying obj as JSON"""
+    payload = orjson.dumps(obj).decode("utf-8") if ORJSON_AVAILABLE else json.dumps(obj)
+    return f"data: {payload}\n\n"
+
+async def _stream_answer(query, sys_prompt, model, gen_kwargs, meta):
+    """Server-sent events: one event per generated chunk, then a final event with metadata"""
+    try:
+        async for token in generate_stream(query, system_prompt=sys_prompt, model=model, **gen_kwargs):
+            yield _sse_data({'token': token})
+        yield _sse_data({'done': True, **meta})
+    except Exception as e:
+        logger.error(f"Quick mode streaming generation failed: {e}")
+        yield _sse_data({'done': True, 'error': str(e), **meta})
+
+def _chat_cache_key(req: ChatRequest) -> str:
+    """Cache key for a chat request; changes whenever the index on disk changes"""
+    normalized_query = " ".join(req.query.split())
+    index_mtime = os.path.getmtime(INDEX_DIR) if INDEX_DIR.exists() else 0
+    return hashlib.sha256(f"{normalized_query}|{req.model}|{req.mode}|{index_mtime}".encode()).hexdigest()
+
 @app.post("/chat")
 async def chat(req: ChatRequest):
+    if req.stream:
+        return await _answer_chat(req)
+    
+    key = _chat_cache_key(req)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    result = await _answer_chat(req)
+    # Only cache complete answers, never failures or partial pipeline runs
+    if "error" not in result and result.get("pipeline_complete", True):
+        response_cache.put(key, result)
+    return result
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit-rate statistics for the chat response cache"""
+    return response_cache.stats()
+
+@app.get("/api/embed_cache/stats")
+async def embed_cache_stats():
+    """Hit-rate statistics for the query embedding cache"""
+    return embedding_cache.stats()
+
+async def _answer_chat(req: ChatRequest):
     if req.mode == "team":
-        result = run_pipeline(req.query, model=req.model)
+        result = await arun_pipeline(req.query, model=req.model)
         return result
     else:
         passages = retrieve(req.query)
         if not passages:
             # If no passages retrieved (e.g., LlamaIndex not available), use direct generation
-            sys_prompt = """You are a helpful AI assistant. Provide a clear, direct answer to the user's question.
-
-GUIDELINES:
-- Be direct and informative
-- Use clear, simple language
-- Focus on answering the question asked
-- Keep your response reasonable and helpful"""
+            sys_prompt = _QUICK_DIRECT_SYS
+            gen_kwargs = dict(
+                max_tokens=512,   # Reasonable token limit
+                temperature=0.7,  # Balanced temperature
+                top_p=0.9,        # Standard sampling
+                num_predict=512,  # Reasonable prediction limit
+                timeout=60        # 1 minute timeout
+            )
             
-            try:
-                answer = generate(
-                    req.query, 
-                    system_prompt=sys_prompt, 
-                    model=req.model,
-                    max_tokens=512,   # Reasonable token limit
-                    temperature=0.7,  # Balanced temperature
-                    top_p=0.9,        # Standard sampling
-                    num_predict=512,  # Reasonable prediction limit
-                    timeout=60        # 1 minute timeout
+            if req.stream:
+                return StreamingResponse(
+                    _stream_answer(req.query, sys_prompt, req.model, gen_kwargs, {"sources": [], "mode": "quick_direct"}),
+                    media_type="text/event-stream"
                 )
+            
+            try:
+                answer = await agenerate(req.query, system_prompt=sys_prompt, model=req.model, **gen_kwargs)
                 return {
                     "answer": answer,
                     "sources": [],
@@ -100,46 +282,43 @@ GUIDELINES:
                     "error": str(e)
                 }
         else:
-            # Limit context length to prevent overwhelming the model
-            context_parts = []
-            total_chars = 0
+            # Limit context length to prevent overwhelming the model: keep the longest
+            # prefix of passages whose combined length fits in max_context_chars
             max_context_chars = 2000  # Limit context to 2000 characters
-            
-            for p in passages:
-                if total_chars + len(p.node.text) <= max_context_chars:
-                    context_parts.append(p.node.text)
-                    total_chars += len(p.node.text)
-                else:
-                    break
+            lens = np.fromiter((len(p.node.text) for p in passages), dtype=np.int64, count=len(passages))
+            cutoff = int(np.searchsorted(np.cumsum(lens), max_context_chars, side="right"))
+            context_parts = [p.node.text for p in passages[:cutoff]]
+            sources = [p.metadata.get("source", "Unknown") for p in passages]
             
             context = "\n".join(context_parts)
             
-            sys_prompt = f"""You are a helpful AI assistant. Answer the user's question using the context provided below.
-
-INSTRUCTIONS:
-- Use the information from the provided context
-- Be clear and informative
-- If the context doesn't contain enough information, mention what's available
-- Provide a helpful response based on the context
-
-Context:
-{context}"""
+            sys_prompt = _QUICK_RAG_SYS_PREFIX + context
+            gen_kwargs = dict(
+                max_tokens=768,   # Reasonable token limit for context-based responses
+                temperature=0.6,  # Balanced temperature
+                top_p=0.9,        # Standard sampling
+                num_predict=768,  # Reasonable prediction limit
+                num_ctx=2048,     # Standard context window
+                timeout=90        # 1.5 minutes timeout
+            )
             
-            try:
-                answer = generate(
-                    req.query, 
-                    system_prompt=sys_prompt, 
-                    model=req.model,
-                    max_tokens=768,   # Reasonable token limit for context-based responses
-                    temperature=0.6,  # Balanced temperature
-                    top_p=0.9,        # Standard sampling
-                    num_predict=768,  # Reasonable prediction limit
-                    num_ctx=2048,     # Standard context window
-                    timeout=90        # 1.5 minutes timeout
+            if req.stream:
+                meta = {
+                    "sources": sources,
+                    "mode": "quick_rag",
+                    "context_length": len(context),
+                    "passages_used": len(context_parts)
+                }
+                return StreamingResponse(
+                    _stream_answer(req.query, sys_prompt, req.model, gen_kwargs, meta),
+                    media_type="text/event-stream"
                 )
+            
+            try:
+                answer = await agenerate(req.query, system_prompt=sys_prompt, model=req.model, **gen_kwargs)
                 return {
                     "answer": answer,
-                    "sources": [p.metadata.get("source", "Unknown") for p in passages],
+                    "sources": sources,
                     "mode": "quick_rag",
                     "context_length": len(context),
                     "passages_used": len(context_parts)
@@ -148,7 +327,7 @@ Context:
                 logger.error(f"Quick mode RAG generation failed: {e}")
                 return {
                     "answer": f"⚠️ Quick mode generation failed: {str(e)}. Please try team mode for more reliable results.",
-                    "sources": [p.metadata.get("source", "Unknown") for p in passages],
+                    "sources": sources,
                     "note": "Generation failed - fallback message provided",
                     "mode": "quick_rag_failed",
                     "error": str(e),
@@ -158,20 +337,37 @@ Context:
 
 # File Management API Endpoints
 
+def _scan_docs() -> List[FileInfo]:
+    """Stat every file in the docs directory once (DirEntry caches the result)"""
+    with os.scandir(DOCS_DIR) as it:
+        return [
+            FileInfo(
+                name=e.name,
+                size=(st := e.stat()).st_size,
+                modified=st.st_mtime,
+                type=os.path.splitext(e.name)[1].lower()
+            )
+            for e in it if e.is_file()
+        ]
+
+async def _docs_stats() -> Dict[str, Any]:
+    """File count and total size of the docs directory, scanned once and then kept up to date"""
+    if not _DOCS_STATS:
+        files = await asyncio.to_thread(_scan_docs)
+        _DOCS_STATS.update(count=len(files), bytes=sum(f.size for f in files))
+    return _DOCS_STATS
+
+def _adjust_docs_stats(count_delta: int, bytes_delta: int):
+    """Apply an upload/delete to the docs stats (no-op until they have been scanned)"""
+    if _DOCS_STATS:
+        _DOCS_STATS["count"] += count_delta
+        _DOCS_STATS["bytes"] += bytes_delta
+
 @app.get("/api/files")
 async def list_files():
     """List all files in the docs directory"""
     try:
-        files = []
-        for file_path in Path(docs_dir).iterdir():
-            if file_path.is_file():
-                stat = file_path.stat()
-                files.append(FileInfo(
-                    name=file_path.name,
-                    size=stat.st_size,
-                    modified=file_path.stat().st_mtime,
-                    type=file_path.suffix.lower()
-                ))
+        files = await asyncio.to_thread(_scan_docs)
         
         # Sort by modification time (newest first)
         files.sort(key=lambda x: x.modified, reverse=True)
@@ -186,53 +382,86 @@ async def list_files():
         logger.error(f"Failed to list files: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
 
+def _resolve_doc_path(filename: str) -> Path:
+    """Resolve a client-supplied filename inside the docs directory, rejecting path traversal"""
+    # Docs are stored flat: a name with directory parts is never a valid doc
+    if not filename or Path(filename).name != filename:
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    target = (DOCS_DIR / filename).resolve()
+    if target == DOCS_DIR or not target.is_relative_to(DOCS_DIR):
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    return target
+
+async def _index_uploaded_file(filename: str, content_hash: str):
+    """Background task: add an uploaded file to the index and record the outcome"""
+    index_jobs[filename] = {"status": "processing", "sha256": content_hash}
+    try:
+        logger.info(f"Processing uploaded file: {filename}")
+        # Add the new document to the index
+        if not await _run_in_pool(build_index_job, docs_dir=str(DOCS_DIR), specific_files=[filename]):
+            raise RuntimeError("no index was built")
+        index_jobs[filename] = {"status": "indexed", "sha256": content_hash}
+        logger.info(f"Successfully processed file: {filename}")
+    except Exception as processing_error:
+        logger.error(f"Failed to process file {filename}: {processing_error}")
+        index_jobs[filename] = {
+            "status": "failed",
+            "sha256": content_hash,
+            "processing_error": str(processing_error)
+        }
+
 @app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """Upload a file to the docs directory and process it into the RAG system"""
     try:
         # Validate file type
-        allowed_extensions = {'.pdf', '.txt', '.doc', '.docx', '.md'}
         file_extension = Path(file.filename).suffix.lower()
         
-        if file_extension not in allowed_extensions:
+        if file_extension not in _ALLOWED_EXTS:
             raise HTTPException(
                 status_code=400, 
-                detail=f"File type {file_extension} not allowed. Allowed types: {', '.join(allowed_extensions)}"
+                detail=f"File type {file_extension} not allowed. Allowed types: {', '.join(sorted(_ALLOWED_EXTS))}"
             )
         
+        file_path = _resolve_doc_path(file.filename)
+        
         # Create docs directory if it doesn't exist
-        os.makedirs(docs_dir, exist_ok=True)
+        DOCS_DIR.mkdir(parents=True, exist_ok=True)
         
-        # Save file
-        file_path = os.path.join(docs_dir, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Save file in fixed-size chunks so large uploads don't block the event loop,
+        # hashing the content on the way through
+        previous_size = file_path.stat().st_size if file_path.is_file() else None
+        digest = hashlib.sha256()
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                await buffer.write(chunk)
+        content_hash = digest.hexdigest()
         
-        # Process the file into the RAG system
-        try:
-            logger.info(f"Processing uploaded file: {file.filename}")
-            # Add the new document to the index
-            build_index(docs_dir=docs_dir, specific_files=[file.filename])
-            logger.info(f"Successfully processed file: {file.filename}")
-            
-            return {
-                "success": True,
-                "message": f"File {file.filename} uploaded and processed successfully",
-                "filename": file.filename,
-                "size": os.path.getsize(file_path),
-                "processed": True
-            }
-        except Exception as processing_error:
-            logger.error(f"Failed to process file {file.filename}: {processing_error}")
-            # File was uploaded but processing failed
-            return {
+        size = os.path.getsize(file_path)
+        if previous_size is None:
+            _adjust_docs_stats(1, size)
+        else:
+            _adjust_docs_stats(0, size - previous_size)
+        
+        # Index the file in the background so the response isn't held for the
+        # whole chunking + embedding pipeline
+        index_jobs[file.filename] = {"status": "queued", "sha256": content_hash}
+        background_tasks.add_task(_index_uploaded_file, file.filename, content_hash)
+        logger.info(f"Queued uploaded file for indexing: {file.filename}")
+        
+        return APIResponse(
+            status_code=202,
+            content={
                 "success": True,
-                "message": f"File {file.filename} uploaded but processing failed: {str(processing_error)}",
+                "status": "queued",
+                "message": f"File {file.filename} uploaded and queued for processing",
                 "filename": file.filename,
-                "size": os.path.getsize(file_path),
-                "processed": False,
-                "processing_error": str(processing_error)
+                "size": size,
+                "sha256": content_hash,
+                "processed": False
             }
+        )
             
     except HTTPException:
         raise
@@ -240,33 +469,48 @@ async def upload_file(file: UploadFile = File(...)):
         logger.error(f"Failed to upload file: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
 
+@app.get("/api/files/{filename}/status")
+async def file_status(filename: str):
+    """Indexing status of an uploaded file"""
+    job = index_jobs.get(filename)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No indexing job for this file")
+    return {"filename": filename, **job}
+
 @app.delete("/api/files/{filename}")
 async def delete_file(filename: str):
     """Delete a file from the docs directory and remove it from the RAG index"""
     try:
-        file_path = os.path.join(docs_dir, filename)
+        file_path = _resolve_doc_path(filename)
         
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail="File not found")
         
-        # Remove the document from the RAG index first
+        # Remove the document from the RAG index first, in the indexing worker so a
+        # rebuild doesn't block the event loop or race another write to the index
+        index_updated = False
         try:
             logger.info(f"Removing document from index: {filename}")
-            remove_document_from_index(filename)
-            logger.info(f"Successfully removed document from index: {filename}")
+            index_updated = await _run_in_pool(remove_document_from_index, filename)
+            if index_updated:
+                logger.info(f"Successfully removed document from index: {filename}")
+            else:
+                logger.warning(f"Failed to remove document from index: {filename}")
         except Exception as index_error:
             logger.warning(f"Failed to remove document from index {filename}: {index_error}")
             # Continue with file deletion even if index removal fails
         
         # Delete the physical file
+        size = file_path.stat().st_size
         os.remove(file_path)
+        _adjust_docs_stats(-1, -size)
         logger.info(f"Successfully deleted file: {filename}")
         
         return {
             "success": True,
             "message": f"File {filename} deleted successfully",
             "filename": filename,
-            "index_updated": True
+            "index_updated": index_updated
         }
     except HTTPException:
         raise
@@ -281,7 +525,8 @@ async def rebuild_knowledge_base():
         logger.info("Starting knowledge base rebuild...")
         
         # Call the rebuild function from RAG module
-        result = rebuild_index()
+        result = await _run_in_pool(rebuild_index)
+        _DOCS_STATS.clear()
         
         if result.get("success"):
             logger.info("Knowledge base rebuilt successfully")
@@ -307,27 +552,28 @@ async def health_check():
     """Health check endpoint to verify system status"""
     try:
         # Check if docs directory exists and is accessible
-        docs_accessible = os.access(docs_dir, os.R_OK)
+        docs_accessible = os.access(DOCS_DIR, os.R_OK)
         
         # Check if index directory exists
-        index_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/index'))
-        index_exists = os.path.exists(index_dir)
+        index_exists = INDEX_DIR.exists()
         
         # Count files
-        file_count = len([f for f in Path(docs_dir).iterdir() if f.is_file()]) if docs_accessible else 0
+        stats = await _docs_stats() if docs_accessible else {"count": 0, "bytes": 0}
         
         return {
             "status": "healthy",
             "docs_directory": {
-                "path": docs_dir,
+                "path": str(DOCS_DIR),
                 "accessible": docs_accessible,
-                "file_count": file_count
+                "file_count": stats["count"],
+                "total_size": stats["bytes"]
             },
             "index_directory": {
-                "path": index_dir,
-                "exists": index_exists
+                "path": str(INDEX_DIR),
+                "exists": index_exists,
+                "building": _index_building()
             },
-            "timestamp": os.path.getmtime(index_dir) if index_exists else None
+            "timestamp": os.path.getmtime(INDEX_DIR) if index_exists else None
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
@@ -1,82 +1,231 @@
 import requests, os
+import json
 import time
+import asyncio
+import logging
+import weakref
+import httpx
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# How long Ollama keeps a model loaded after a request (it unloads idle models after 5m by default)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
 
+# Request tracing is logged at DEBUG, below the app's INFO level; set OLLAMA_LOG_LEVEL=DEBUG
+# to trace. Unset, the level is left to the application's logging config.
+logger = logging.getLogger(__name__)
+_LOG_LEVEL = os.getenv("OLLAMA_LOG_LEVEL", "").upper()
+if isinstance(logging.getLevelName(_LOG_LEVEL), int):
+    logger.setLevel(_LOG_LEVEL)
+elif _LOG_LEVEL:
+    logger.warning("Ignoring invalid OLLAMA_LOG_LEVEL %r", _LOG_LEVEL)
 
-def generate(prompt: str, system_prompt: str = "", model: str = "gemma3:4b", **kwargs) -> str:
-    """Call the local Ollama REST API and return the model's reply."""
-    print(f"🚀 [DEBUG] Ollama generate() called")
-    print(f"🔧 [DEBUG] Model: {model}")
-    print(f"📝 [DEBUG] Prompt length: {len(prompt)} characters")
-    print(f"📝 [DEBUG] System prompt length: {len(system_prompt)} characters")
-    print(f"⚙️ [DEBUG] Additional kwargs: {kwargs}")
-    
-    # Build the request payload with all parameters
+# Payloads are encoded/decoded with orjson when installed, stdlib json otherwise
+if ORJSON_AVAILABLE:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+    _loads = json.loads
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# One pooled keep-alive client per event loop; httpx connections cannot be shared across loops
+_CLIENTS = weakref.WeakKeyDictionary()
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the pooled async client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            base_url=OLLAMA_URL,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=40, max_connections=64, keepalive_expiry=30),
+            timeout=httpx.Timeout(120.0),
+        )
+        _CLIENTS[loop] = client
+    return client
+
+
+# Keep-alive session for the blocking generate(), so repeated calls reuse the connection
+_SESSION = requests.Session()
+
+
+async def aclose_client() -> None:
+    """Close the pooled async client of the running event loop, if any."""
+    client = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# Generation defaults; explicitly provided parameters take precedence
+_DEFAULTS = {
+    "stream": False,
+    "num_predict": 512,  # Reasonable default length
+    "top_k": 40,  # Balanced sampling
+    "top_p": 0.9,  # Standard top_p sampling
+    "temperature": 0.7,  # Balanced temperature
+    "repeat_penalty": 1.1,  # Standard repeat penalty
+    "num_ctx": 2048,  # Standard context window
+    "stop": ["\n\n\n"],  # Minimal stop tokens
+    "keep_alive": OLLAMA_KEEP_ALIVE,  # Hold the model in memory between requests
+}
+
+# Client-side options that are not sent to Ollama (max_tokens is mapped to num_predict)
+_SKIP = frozenset({"max_tokens", "timeout"})
+
+
+def _build_payload(prompt: str, system_prompt: str, model: str, kwargs: dict) -> dict:
+    """Build the /api/generate request payload shared by generate() and agenerate()."""
     payload = {
-        "model": model, 
-        "prompt": f"{system_prompt}\n{prompt}", 
-        "stream": False,
-        # Performance optimization parameters with better defaults
-        "num_predict": kwargs.get("num_predict", kwargs.get("max_tokens", 512)),  # Use provided or reasonable default
-        "top_k": kwargs.get("top_k", 40),  # Balanced sampling
-        "top_p": kwargs.get("top_p", 0.9),  # Standard top_p sampling
-        "temperature": kwargs.get("temperature", 0.7),  # Balanced temperature
-        "repeat_penalty": kwargs.get("repeat_penalty", 1.1),  # Standard repeat penalty
-        "num_ctx": kwargs.get("num_ctx", 2048),  # Standard context window
-        "stop": kwargs.get("stop", ["\n\n\n"]),  # Minimal stop tokens
+        **_DEFAULTS,
+        **{k: v for k, v in kwargs.items() if v is not None and k not in _SKIP},
+        "model": model,
+        "prompt": f"{system_prompt}\n{prompt}",
     }
+    if kwargs.get("num_predict") is None and kwargs.get("max_tokens") is not None:
+        payload["num_predict"] = kwargs["max_tokens"]
+    return payload
+
+
+def generate(prompt: str, system_prompt: str = "", model: str = "gemma3:4b", **kwargs) -> str:
+    """Call the local Ollama REST API and return the model's reply."""
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("Ollama generate model=%s prompt_len=%d system_prompt_len=%d kwargs=%s",
+                     model, len(prompt), len(system_prompt), kwargs)
     
-    # Override with any explicitly provided parameters (this ensures user parameters take precedence)
-    for key, value in kwargs.items():
-        if value is not None and key not in ["max_tokens"]:  # Skip max_tokens as it's handled by num_predict
-            payload[key] = value
+    payload = _build_payload(prompt, system_prompt, model, kwargs)
     
-    print(f"📤 [DEBUG] Request payload: {payload}")
-    print(f"🌐 [DEBUG] Ollama URL: {OLLAMA_URL}")
+    # Use reasonable timeout defaults
+    timeout = kwargs.get("timeout", 120)  # Default 2 minutes
+    if debug:
+        logger.debug("Ollama request url=%s timeout=%ss payload=%s", OLLAMA_URL, timeout, payload)
     
     try:
-        # Use reasonable timeout defaults
-        timeout = kwargs.get("timeout", 120)  # Default 2 minutes
-        print(f"⏱️ [DEBUG] Request timeout: {timeout} seconds")
-        
-        print(f"📡 [DEBUG] Sending POST request to Ollama...")
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        resp = requests.post(
+        resp = _SESSION.post(
             f"{OLLAMA_URL}/api/generate",
-            json=payload,
+            data=_dumps(payload),
+            headers=_JSON_HEADERS,
             timeout=timeout,
         )
         
-        request_time = time.time() - start_time
-        print(f"✅ [DEBUG] Ollama response received in {request_time:.2f} seconds")
-        print(f"📊 [DEBUG] Response status: {resp.status_code}")
-        
         resp.raise_for_status()
+        result = _loads(resp.content)["response"]
         
-        response_data = resp.json()
-        result = response_data["response"]
-        
-        print(f"✅ [DEBUG] Response parsed successfully")
-        print(f"📄 [DEBUG] Response length: {len(result)} characters")
-        print(f"📄 [DEBUG] Response preview: {result[:100]}...")
+        if debug:
+            logger.debug("Ollama response status=%d in %.2fs, %d chars: %.100s",
+                         resp.status_code, time.perf_counter() - start_time, len(result), result)
         
         return result
         
     except requests.exceptions.Timeout:
         error_msg = f"Ollama request timed out after {timeout} seconds. Model: {model}"
-        print(f"❌ [DEBUG] {error_msg}")
+        logger.error(error_msg)
         raise Exception(error_msg)
     except requests.exceptions.ConnectionError:
         error_msg = f"Could not connect to Ollama server at {OLLAMA_URL}"
-        print(f"❌ [DEBUG] {error_msg}")
+        logger.error(error_msg)
         raise Exception(error_msg)
     except Exception as e:
-        error_msg = f"Ollama request failed: {str(e)}"
-        print(f"❌ [DEBUG] {error_msg}")
-        print(f"🔍 [DEBUG] Error type: {type(e).__name__}")
-        import traceback
-        print(f"📋 [DEBUG] Full traceback:")
-        traceback.print_exc()
-        raise Exception(error_msg)
\ No newline at end of file
+        logger.exception("Ollama request failed")
+        raise Exception(f"Ollama request failed: {str(e)}")
+
+
+async def agenerate(prompt: str, system_prompt: str = "", model: str = "gemma3:4b", **kwargs) -> str:
+    """Async variant of generate() so independent agent calls can overlap.
+
+    Ollama only serves requests concurrently when started with
+    OLLAMA_NUM_PARALLEL > 1 (and OLLAMA_MAX_LOADED_MODELS when several
+    models are in play); otherwise requests are queued server-side.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("Ollama agenerate model=%s prompt_len=%d", model, len(prompt))
+    
+    payload = _build_payload(prompt, system_prompt, model, kwargs)
+    timeout = kwargs.get("timeout", 120)
+    
+    try:
+        start_time = time.perf_counter()
+        
+        resp = await _get_client().post(
+            "/api/generate", content=_dumps(payload), headers=_JSON_HEADERS, timeout=timeout
+        )
+        
+        resp.raise_for_status()
+        result = _loads(resp.content)["response"]
+        
+        if debug:
+            logger.debug("Ollama response in %.2fs, %d chars", time.perf_counter() - start_time, len(result))
+        
+        return result
+        
+    except httpx.TimeoutException:
+        error_msg = f"Ollama request timed out after {timeout} seconds. Model: {model}"
+        logger.error(error_msg)
+        raise Exception(error_msg)
+    except httpx.ConnectError:
+        error_msg = f"Could not connect to Ollama server at {OLLAMA_URL}"
+        logger.error(error_msg)
+        raise Exception(error_msg)
+    except Exception as e:
+        logger.exception("Ollama request failed")
+        raise Exception(f"Ollama request failed: {str(e)}")
+
+
+async def warmup(model: str = "gemma3:4b", keep_alive: str = OLLAMA_KEEP_ALIVE) -> bool:
+    """Load a model into memory ahead of the first request; returns whether it succeeded.
+
+    A /api/generate request without a prompt only loads the model.
+    """
+    try:
+        start_time = time.perf_counter()
+        resp = await _get_client().post(
+            "/api/generate",
+            content=_dumps({"model": model, "keep_alive": keep_alive}),
+            headers=_JSON_HEADERS,
+        )
+        resp.raise_for_status()
+        logger.info("Ollama model %s warmed up in %.2fs", model, time.perf_counter() - start_time)
+        return True
+    except Exception as e:
+        logger.warning("Ollama warmup of %s failed: %s", model, e)
+        return False
+
+
+async def generate_stream(prompt: str, system_prompt: str = "", model: str = "gemma3:4b", **kwargs):
+    """Stream the model's reply from Ollama, yielding text chunks as they are generated."""
+    payload = _build_payload(prompt, system_prompt, model, kwargs)
+    payload["stream"] = True
+    timeout = kwargs.get("timeout", 120)
+    
+    try:
+        async with _get_client().stream(
+            "POST", "/api/generate", content=_dumps(payload), headers=_JSON_HEADERS, timeout=timeout
+        ) as resp:
+            resp.raise_for_status()
+            # Ollama streams one JSON object per line
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                chunk = _loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+                    
+    except httpx.TimeoutException:
+        raise Exception(f"Ollama request timed out after {timeout} seconds. Model: {model}")
+    except httpx.ConnectError:
+        raise Exception(f"Could not connect to Ollama server at {OLLAMA_URL}")
@@ -1,5 +1,8 @@
 # pipeline_config.py
 
+import re
+from operator import itemgetter
+
 try:
     from .config_loader import get_pipeline_steps, get_agent_config
 except ImportError:
@@ -13,8 +16,40 @@ def get_pipeline_config():
     """Get the pipeline configuration from YAML"""
     return get_pipeline_steps()
 
+def _compile_template(template, inputs):
+    """Precompile a prompt template into a render(**values) closure
+    
+    The template is split once around its {input} placeholders, so rendering is a
+    join of constant segments and values with no format parsing. Only the declared
+    inputs are placeholders; any other braces (e.g. in agent descriptions) are kept.
+    """
+    pattern = re.compile("{(%s)}" % "|".join(map(re.escape, inputs)))
+    parts = pattern.split(template)
+    segments, names = parts[0::2], parts[1::2]
+    
+    if not names:
+        return lambda **values: template
+    
+    getter = itemgetter(*names)
+    single = len(names) == 1
+    
+    def render(**values):
+        picked = getter(values)
+        if single:
+            picked = (picked,)
+        out = [segments[0]]
+        for value, segment in zip(picked, segments[1:]):
+            out.append(str(value))
+            out.append(segment)
+        return "".join(out)
+    
+    return render
+
 def get_pipeline_prompts():
-    """Get formatted prompts for the pipeline steps"""
+    """Get formatted prompts for the pipeline steps
+    
+    Each step's "prompt_template" is a render closure: prompt_template(**inputs)
+    """
     steps = get_pipeline_steps()
     prompts = []
     
@@ -52,7 +87,7 @@ def get_pipeline_prompts():
         prompts.append({
             "name": step['name'],
             "agent": step['agent'],
-            "prompt_template": prompt_template,
+            "prompt_template": _compile_template(prompt_template, inputs),
             "inputs": inputs,
             "output_key": output_key,
             "description": step.get('description', ''),
@@ -63,5 +98,9 @@ def get_pipeline_prompts():
     
     return prompts
 
-# Legacy support - keep the old PIPELINE for backward compatibility
-PIPELINE = get_pipeline_prompts()
+def __getattr__(name):
+    # Legacy support - keep the old PIPELINE for backward compatibility, built on first access
+    if name == "PIPELINE":
+        return get_pipeline_prompts()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
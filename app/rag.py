@@ -1,11 +1,24 @@
 import os
+import json
 import argparse
+import asyncio
+import logging
 from typing import List, Dict, Any
+from functools import lru_cache
+from string import Template
+from graphlib import TopologicalSorter, CycleError
 import time
 
 try:
-    from .ollama_client import generate
-    from .indexer import build_index, retrieve
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    from .ollama_client import agenerate
+    from .indexer import build_index, retrieve, embed_query
+    from .semantic_cache import SemanticCache
     from .agents.decomposer import DecomposerAgent
     from .agents.critique import CritiqueAgent
     from .agents.synthesis import SynthesisAgent
@@ -16,14 +29,24 @@ except ImportError:
     import sys
     from pathlib import Path
     sys.path.append(str(Path(__file__).parent))
-    from ollama_client import generate
-    from indexer import build_index, retrieve
+    from ollama_client import agenerate
+    from indexer import build_index, retrieve, embed_query
+    from semantic_cache import SemanticCache
     from agents.decomposer import DecomposerAgent
     from agents.critique import CritiqueAgent
     from agents.synthesis import SynthesisAgent
     from agents.report_formatter import ReportFormatterAgent
     from config_loader import get_pipeline_steps, get_agent_config, get_config
 
+# Per-step pipeline tracing is logged at DEBUG, below the app's INFO level; set RAG_LOG_LEVEL=DEBUG
+# to trace. Unset, the level is left to the application's logging config.
+logger = logging.getLogger(__name__)
+_LOG_LEVEL = os.getenv("RAG_LOG_LEVEL", "").upper()
+if isinstance(logging.getLevelName(_LOG_LEVEL), int):
+    logger.setLevel(_LOG_LEVEL)
+elif _LOG_LEVEL:
+    logger.warning("Ignoring invalid RAG_LOG_LEVEL %r", _LOG_LEVEL)
+
 DOCS_DIR = os.getenv("DOCS_DIR", "data/docs")
 INDEX_DIR = os.getenv("INDEX_DIR", "data/index")
 
@@ -53,141 +76,358 @@ AGENT_MAP = {
     "report_formatter": ReportFormatterAgent,
 }
 
+# Completed pipeline results per model, looked up by query-embedding similarity so
+# near-duplicate questions skip retrieval and every agent call
+_PIPELINE_CACHES: Dict[str, SemanticCache] = {}
+
+def _pipeline_cache(model):
+    return _PIPELINE_CACHES.setdefault(model, SemanticCache(threshold=0.85, dedup_threshold=0.95, ttl=300))
+
+def clear_pipeline_cache():
+    """Forget cached pipeline results (call whenever the document index changes)"""
+    for cache in _PIPELINE_CACHES.values():
+        cache.clear()
+
 def sources_to_markdown(sources):
     """Convert source list to markdown format"""
-    if not sources:
-        return "No sources available"
+    return "\n".join(
+        f"{i}. **{source}**" if source and source != "Unknown" else f"{i}. Unknown source"
+        for i, source in enumerate(sources, 1)
+    ) or "No sources available"
+
+# Step prompts per agent, parsed once at import
+PROMPT_TEMPLATES = {
+    "decomposer": Template("## $step_name\n\n### User Query\n$query\n\nPlease break down this research question into structured components following the format in your instructions."),
+    "critique": Template("## $step_name\n\n### Breakdown to Review\n$breakdown\n\nPlease review and improve this research framework following your instructions."),
+    "synthesis": Template("## $step_name\n\n### Query\n$query\n\n### Breakdown\n$breakdown\n\n### Critique\n$critique\n\nPlease synthesize this information into a comprehensive analysis."),
+    "report_formatter": Template("## $step_name\n\n**Topic:** $query\n\n**Analysis:** $synthesis\n\n**Framework:** $breakdown\n\n**Review:** $critique\n\nPlease create a comprehensive, professional report."),
+}
+DEFAULT_PROMPT_TEMPLATE = Template("## $step_name\n\n$description\n\nPlease process the following information:\n$context")
+
+# Retrieved context and sources, sent once per run ahead of every agent's system prompt.
+# All requests of a run then start with the same text, whose KV cache Ollama can reuse.
+SHARED_PREFIX_TEMPLATE = Template("### Shared Context\n$context\n\n### Sources\n$sources_md\n\n")
+SHARED_CONTEXT_CHARS = 1000
+
+# Context key each agent's output is stored under
+OUTPUT_KEYS = {
+    "decomposer": "breakdown",
+    "critique": "critique",
+    "synthesis": "synthesis",
+    "report_formatter": "final_report",
+}
+
+# Characters of each input passed to an agent; later agents get shorter excerpts
+# of earlier outputs to keep prompts small enough to avoid timeouts
+PROMPT_INPUT_LIMITS = {
+    "decomposer": {},
+    "critique": {"breakdown": 800},
+    "synthesis": {"breakdown": 400, "critique": 400},
+    "report_formatter": {"breakdown": 300, "critique": 300, "synthesis": 400},
+}
+
+# Report used when report_formatter is rendered in Python rather than by the LLM
+# (pipeline.behavior.llm_report_formatting: false); the default output.report_templates
+# entry supplies the subtitle and may replace the layout with its own "markdown" template
+DEFAULT_REPORT_TEMPLATE = Template(
+    "# $query\n\n*$template_name*\n\n## Analysis\n\n$synthesis\n\n"
+    "## Research Framework\n\n$breakdown\n\n## Review\n\n$critique\n\n## Sources\n\n$sources_md\n"
+)
+
+# Appended to the critique step prompt when pipeline.behavior.skip_synthesis_if_sound is on
+CRITIQUE_JSON_INSTRUCTION = (
+    "\n\nRespond only with a JSON object of the form "
+    '{"needs_revision": true or false, "revised_breakdown": "<improved breakdown, or empty if none is needed>"}.'
+)
+
+# Analysis section of the rendered report when the critique let the breakdown stand in for synthesis
+SKIPPED_SYNTHESIS_NOTE = "The critique found the research framework sound, so it stands as the analysis (see below)."
+
+def _truncate(text, limit):
+    return text[:limit] + "..." if len(text) > limit else text
+
+def _make_prompt_fn(step, agent_config):
+    """Build a ctx -> prompt function for a pipeline step, with its constant parts bound"""
+    agent_name = step["agent"]
+    step_name = step["name"]
+    template = PROMPT_TEMPLATES.get(agent_name)
+    
+    if template is None:
+        description = agent_config["description"]
+        return lambda ctx: DEFAULT_PROMPT_TEMPLATE.substitute(
+            step_name=step_name, description=description, context=ctx["context"]
+        )
     
-    md_sources = []
-    for i, source in enumerate(sources, 1):
-        if source and source != "Unknown":
-            md_sources.append(f"{i}. **{source}**")
-        else:
-            md_sources.append(f"{i}. Unknown source")
+    limits = tuple(PROMPT_INPUT_LIMITS[agent_name].items())
     
-    return "\n".join(md_sources)
+    def prompt_fn(ctx):
+        values = {"step_name": step_name, "query": ctx["query"]}
+        for key, limit in limits:
+            values[key] = _truncate(str(ctx.get(key, "N/A")), limit)
+        return template.substitute(values)
+    
+    return prompt_fn
 
-def run_pipeline(query, model="gemma3:4b"):  # Default to Gemma 3 4B
-    """Run the multi-agent pipeline for comprehensive research analysis"""
-    print(f"🚀 [DEBUG] Starting multi-agent pipeline for query: {query[:50]}...")
-    print(f"🔧 [DEBUG] Using model: {model}")
+def _make_report_fn(config):
+    """Build a ctx -> report function from the configured default report template"""
+    report_template = config.get_report_templates().get(config.get_default_template(), {})
+    template = Template(report_template["markdown"]) if "markdown" in report_template else DEFAULT_REPORT_TEMPLATE
+    template_name = report_template.get("name", "Research Report")
+    
+    def report_fn(ctx):
+        values = {key: ctx.get(key, "N/A") for key in ("breakdown", "critique", "synthesis")}
+        if ctx.get("synthesis_skipped"):
+            # The synthesis is the breakdown itself; don't print it twice
+            values["synthesis"] = SKIPPED_SYNTHESIS_NOTE
+        return template.safe_substitute(
+            template_name=template_name,
+            query=ctx["query"],
+            sources_md=ctx["sources_md"],
+            **values
+        )
+    
+    return report_fn
+
+def _parse_critique(output):
+    """The needs_revision/revised_breakdown object of a JSON critique, or None when there is none"""
+    start, end = output.find("{"), output.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        verdict = _json_loads(output[start:end + 1])
+    except ValueError:
+        return None
+    return verdict if isinstance(verdict, dict) and "needs_revision" in verdict else None
+
+async def _return_prompt(prompt, model, shared_prefix=""):
+    """Runner for steps rendered in Python: the "prompt" already is the output"""
+    return prompt
+
+# Steps of the last pipeline config seen, annotated with their bound agent runner,
+# prompt function and output key; rebuilt when reload_config() replaces the steps
+_BOUND_STEPS = (None, [])
+
+def _bind_steps(config, pipeline_steps):
+    """Copies of the pipeline steps with "_runner", "_prompt_fn", "_output_key" and "_uses_llm" pre-bound"""
+    global _BOUND_STEPS
+    if _BOUND_STEPS[0] is not pipeline_steps:
+        behavior = config.get_pipeline_behavior()
+        llm_report = behavior.get("llm_report_formatting", False)
+        json_critique = behavior.get("skip_synthesis_if_sound", False)
+        bound = []
+        for step in pipeline_steps:
+            agent_name = step["agent"]
+            if agent_name == "report_formatter" and not llm_report:
+                # The report only lays out earlier outputs: render it without an LLM call
+                runner, prompt_fn = _return_prompt, _make_report_fn(config)
+            else:
+                runner = AGENT_MAP[agent_name].arun
+                prompt_fn = _make_prompt_fn(step, config.get_agent_config(agent_name))
+                if agent_name == "critique" and json_critique:
+                    prompt_fn = lambda ctx, base=prompt_fn: base(ctx) + CRITIQUE_JSON_INSTRUCTION
+            bound.append({
+                **step,
+                "_runner": runner,
+                "_prompt_fn": prompt_fn,
+                "_output_key": OUTPUT_KEYS.get(agent_name, f"{agent_name}_output"),
+                "_uses_llm": runner is not _return_prompt,
+            })
+        _BOUND_STEPS = (pipeline_steps, bound)
+    return _BOUND_STEPS[1]
+
+@lru_cache(maxsize=8)
+def _stage_layout(step_deps):
+    """Topologically layer steps given as ((agent, depends_on), ...); returns tuples of step indices"""
+    indices_by_agent = {}
+    for i, (agent_name, _) in enumerate(step_deps):
+        indices_by_agent.setdefault(agent_name, []).append(i)
+    
+    sorter = TopologicalSorter()
+    for i, (_, depends_on) in enumerate(step_deps):
+        # Dependencies on agents that aren't in the pipeline are ignored
+        sorter.add(i, *[j for dep in depends_on for j in indices_by_agent.get(dep, []) if j != i])
+    
+    try:
+        sorter.prepare()
+    except CycleError:
+        # Circular dependencies: fall back to declaration order
+        return tuple((i,) for i in range(len(step_deps)))
+    
+    layers = []
+    while sorter.is_active():
+        ready = sorted(sorter.get_ready())
+        layers.append(tuple(ready))
+        sorter.done(*ready)
+    return tuple(layers)
+
+def _group_into_stages(pipeline_steps):
+    """Group (index, step) pairs into stages whose steps only depend on earlier stages"""
+    step_deps = tuple((step["agent"], tuple(step.get("depends_on", []))) for step in pipeline_steps)
+    return [[(i, pipeline_steps[i]) for i in layer] for layer in _stage_layout(step_deps)]
+
+async def _run_step(i, step, total_steps, ctx, model):
+    """Run a single pipeline step and return its output key, output and step info"""
+    step_name = step["name"]
+    agent_name = step["agent"]
+    
+    logger.debug("Starting step %d/%d: %s (agent %s)", i + 1, total_steps, step_name, agent_name)
+    
+    try:
+        # Create prompt with the step's pre-bound prompt function
+        prompt = step["_prompt_fn"](ctx)
+        output_key = step["_output_key"]
+        logger.debug("Prompt for %s created (%d characters), output key %s", agent_name, len(prompt), output_key)
+        
+        # Run the agent
+        start_time = time.perf_counter()
+        
+        output = await step["_runner"](prompt, model, shared_prefix=ctx["shared_prefix"])
+        
+        execution_time = time.perf_counter() - start_time
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Agent %s completed in %.2f seconds, %d characters: %.100s...",
+                         agent_name, execution_time, len(output), output)
+        
+        # Add step info for debugging
+        step_info = {
+            "name": step_name,
+            "output": output,
+            "markdown": True,
+            "step_number": i + 1,
+            "agent_name": agent_name,
+            "estimated_time": step.get("estimated_time", 2),
+            "description": step.get("description", ""),
+            "execution_time": execution_time
+        }
+        
+        return output_key, output, step_info
+        
+    except Exception as step_error:
+        logger.error("Step %s failed: %s: %s", step_name, type(step_error).__name__, step_error)
+        
+        # Re-raise to be caught by the pipeline exception handler
+        raise step_error
+
+async def arun_pipeline(query, model="gemma3:4b"):  # Default to Gemma 3 4B
+    """Run the multi-agent pipeline, running steps without mutual dependencies concurrently"""
+    logger.debug("Starting multi-agent pipeline with model %s for query: %.50s...", model, query)
+    
+    steps = []
+    sources = []
+    context = ""
+    prefill_tasks = []
+    
+    try:
+        query_embedding = embed_query(query)
+    except Exception as e:
+        logger.warning("Could not embed query for the pipeline cache: %s", e)
+        query_embedding = None
+    
+    if query_embedding is not None:
+        cached = _pipeline_cache(model).get(query_embedding)
+        if cached is not None:
+            logger.debug("Returning cached result for a similar query")
+            return {**cached, "cached": True}
     
     try:
         # Get pipeline configuration from YAML
-        print("📋 [DEBUG] Loading pipeline configuration...")
         config = get_config()
-        pipeline_steps = config.get_pipeline_steps()
-        print(f"✅ [DEBUG] Loaded {len(pipeline_steps)} pipeline steps")
+        # Agents, prompt functions and output keys are bound once per loaded config
+        pipeline_steps = _bind_steps(config, config.get_pipeline_steps())
+        logger.debug("Loaded %d pipeline steps", len(pipeline_steps))
         
         # Retrieve relevant context (reduced from 8 to 4 for performance)
-        print("🔍 [DEBUG] Retrieving relevant context...")
         passages = retrieve(query, k=4)
-        context = "\n".join(p.node.text for p in passages)
-        sources = [p.metadata.get("source") for p in passages]
+        # Overlapping chunks can come back more than once; send each passage text only once
+        context = "\n".join(dict.fromkeys(p.node.text for p in passages))
+        # Several passages often come from the same document: list each source once, in rank order
+        sources = list(dict.fromkeys(p.metadata.get("source") or "Unknown" for p in passages))
         sources_md = sources_to_markdown(sources)
-        print(f"✅ [DEBUG] Retrieved {len(passages)} passages, {len(context)} characters")
+        logger.debug("Retrieved %d passages, %d characters", len(passages), len(context))
         
         # Initialize context with query and retrieved information
         ctx = {
             "query": query, 
             "context": context, 
-            "sources_md": sources_md
+            "sources_md": sources_md,
+            "shared_prefix": SHARED_PREFIX_TEMPLATE.substitute(
+                context=_truncate(context, SHARED_CONTEXT_CHARS), sources_md=sources_md
+            )
         }
-        print("📝 [DEBUG] Context initialized")
         
-        # Run the pipeline and collect intermediate results for debugging
-        steps = []
-        step_names = [step["name"] for step in pipeline_steps]
-        print(f"🔄 [DEBUG] Pipeline steps: {step_names}")
+        # Run the pipeline stage by stage and collect intermediate results for debugging
+        stages = _group_into_stages(pipeline_steps)
+        behavior = config.get_pipeline_behavior()
+        if not behavior.get("parallel_processing", True):
+            # Concurrency disabled in the config: run the steps one at a time
+            stages = [[item] for stage in stages for item in stage]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Pipeline stages: %s", [[step["name"] for _, step in stage] for stage in stages])
         
-        for i, step in enumerate(pipeline_steps):
-            step_name = step["name"]
-            agent_name = step["agent"]
+        # Optionally warm the next stage's system prompts while the current stage generates
+        prefill_next = behavior.get("prefill_next_step", False)
+        # Optionally let a critique that finds nothing to revise stand in for synthesis
+        critique_early_exit = behavior.get("skip_synthesis_if_sound", False)
+        skip_keys = set()
+        
+        for stage_number, stage in enumerate(stages):
+            if skip_keys:
+                # Steps whose output is already settled are recorded as skipped instead of run
+                for i, step in stage:
+                    if step["_output_key"] in skip_keys:
+                        steps.append({
+                            "name": step["name"],
+                            "output": ctx[step["_output_key"]],
+                            "markdown": True,
+                            "step_number": i + 1,
+                            "agent_name": step["agent"],
+                            "estimated_time": step.get("estimated_time", 2),
+                            "description": step.get("description", ""),
+                            "execution_time": 0,
+                            "skipped": True
+                        })
+                stage = [(i, step) for i, step in stage if step["_output_key"] not in skip_keys]
             
-            print(f"\n🔄 [DEBUG] Starting step {i+1}/{len(pipeline_steps)}: {step_name}")
-            print(f"🤖 [DEBUG] Using agent: {agent_name}")
+            step_tasks = [
+                asyncio.create_task(_run_step(i, step, len(pipeline_steps), ctx, model))
+                for i, step in stage
+            ]
             
-            try:
-                # Get agent class and configuration
-                print(f"⚙️ [DEBUG] Getting agent configuration for {agent_name}...")
-                agent_cls = AGENT_MAP[agent_name]
-                agent_config = config.get_agent_config(agent_name)
-                print(f"✅ [DEBUG] Agent config loaded: {agent_config.get('name', 'Unknown')}")
-                
-                # Create prompt based on step configuration
-                print(f"📝 [DEBUG] Creating prompt for {agent_name}...")
-                if agent_name == "decomposer":
-                    # Use minimal context for decomposer to avoid timeout
-                    truncated_context = context[:1000] + "..." if len(context) > 1000 else context
-                    prompt = f"## {step_name}\n\n### User Query\n{query}\n\n### Context\n{truncated_context}\n\nPlease break down this research question into structured components following the format in your instructions."
-                    output_key = "breakdown"
-                elif agent_name == "critique":
-                    # Use minimal context for critique, focus on breakdown analysis
-                    breakdown_text = str(ctx.get('breakdown', 'N/A'))[:800] + "..." if len(str(ctx.get('breakdown', 'N/A'))) > 800 else str(ctx.get('breakdown', 'N/A'))
-                    prompt = f"## {step_name}\n\n### Breakdown to Review\n{breakdown_text}\n\nPlease review and improve this research framework following your instructions."
-                    output_key = "critique"
-                elif agent_name == "synthesis":
-                    # Use only previous agent outputs for synthesis, minimal context
-                    breakdown_text = str(ctx.get('breakdown', 'N/A'))[:400] + "..." if len(str(ctx.get('breakdown', 'N/A'))) > 400 else str(ctx.get('breakdown', 'N/A'))
-                    critique_text = str(ctx.get('critique', 'N/A'))[:400] + "..." if len(str(ctx.get('critique', 'N/A'))) > 400 else str(ctx.get('critique', 'N/A'))
-                    prompt = f"## {step_name}\n\n### Query\n{query}\n\n### Breakdown\n{breakdown_text}\n\n### Critique\n{critique_text}\n\nPlease synthesize this information into a comprehensive analysis."
-                    output_key = "synthesis"
-                elif agent_name == "report_formatter":
-                    # Use truncated outputs for final report to avoid timeout
-                    breakdown_short = str(ctx.get('breakdown', 'N/A'))[:300] + "..." if len(str(ctx.get('breakdown', 'N/A'))) > 300 else str(ctx.get('breakdown', 'N/A'))
-                    critique_short = str(ctx.get('critique', 'N/A'))[:300] + "..." if len(str(ctx.get('critique', 'N/A'))) > 300 else str(ctx.get('critique', 'N/A'))
-                    synthesis_short = str(ctx.get('synthesis', 'N/A'))[:400] + "..." if len(str(ctx.get('synthesis', 'N/A'))) > 400 else str(ctx.get('synthesis', 'N/A'))
-                    prompt = f"## {step_name}\n\n**Topic:** {query}\n\n**Analysis:** {synthesis_short}\n\n**Framework:** {breakdown_short}\n\n**Review:** {critique_short}\n\nPlease create a comprehensive, professional report."
-                    output_key = "final_report"
-                else:
-                    prompt = f"## {step_name}\n\n{agent_config['description']}\n\nPlease process the following information:\n{context}"
-                    output_key = f"{agent_name}_output"
-                
-                print(f"📝 [DEBUG] Prompt created ({len(prompt)} characters)")
-                print(f"🔑 [DEBUG] Output key: {output_key}")
-                
-                # Run the agent
-                print(f"🚀 [DEBUG] Starting agent execution for {agent_name}...")
-                start_time = time.time()
-                
-                output = agent_cls.run(prompt, model)
-                
-                execution_time = time.time() - start_time
-                print(f"✅ [DEBUG] Agent {agent_name} completed in {execution_time:.2f} seconds")
-                print(f"📄 [DEBUG] Output length: {len(output)} characters")
-                print(f"📄 [DEBUG] Output preview: {output[:100]}...")
-                
-                ctx[output_key] = output
-                
-                # Add step info for debugging
-                steps.append({
-                    "name": step_name,
-                    "output": output,
-                    "markdown": True,
-                    "step_number": i + 1,
-                    "agent_name": agent_name,
-                    "estimated_time": step.get("estimated_time", 2),
-                    "description": step.get("description", ""),
-                    "execution_time": execution_time
-                })
-                
-                print(f"✅ [DEBUG] Step {step_name} completed successfully")
-                
-            except Exception as step_error:
-                print(f"❌ [DEBUG] Step {step_name} failed with error: {step_error}")
-                print(f"🔍 [DEBUG] Error type: {type(step_error).__name__}")
-                import traceback
-                print(f"📋 [DEBUG] Full traceback:")
-                traceback.print_exc()
-                
-                # Re-raise to be caught by outer exception handler
-                raise step_error
+            # Created after the stage's own tasks, so the real requests reach Ollama first
+            if prefill_next and stage_number + 1 < len(stages):
+                prefill_tasks.extend(
+                    asyncio.create_task(AGENT_MAP[step["agent"]].aprefill(model, shared_prefix=ctx["shared_prefix"]))
+                    for _, step in stages[stage_number + 1]
+                    if step["_uses_llm"] and step["_output_key"] not in skip_keys
+                )
+            
+            results = await asyncio.gather(*step_tasks, return_exceptions=True)
+            
+            # Keep the outputs of steps that succeeded before surfacing a failure
+            errors = [r for r in results if isinstance(r, BaseException)]
+            for result in results:
+                if not isinstance(result, BaseException):
+                    output_key, output, step_info = result
+                    ctx[output_key] = output
+                    steps.append(step_info)
+                    
+                    if output_key == "critique" and critique_early_exit:
+                        verdict = _parse_critique(output)
+                        if verdict is not None:
+                            # Later prompts get the revised breakdown rather than the raw JSON
+                            ctx["critique"] = str(verdict.get("revised_breakdown") or "No revisions needed.")
+                            if verdict["needs_revision"] in (False, "false"):
+                                ctx["synthesis"] = ctx.get("breakdown", "")
+                                ctx["synthesis_skipped"] = True
+                                skip_keys.add("synthesis")
+            
+            if errors:
+                raise errors[0]
         
-        print(f"\n🎉 [DEBUG] All pipeline steps completed successfully!")
-        print(f"📊 [DEBUG] Total steps: {len(steps)}")
+        logger.debug("All %d pipeline steps completed successfully", len(steps))
         
         # Return successful result
-        return {
+        result = {
             "answer": ctx.get("final_report", "Pipeline completed but no final report generated"),
             "sources": sources,
             "debug_steps": steps,
@@ -199,31 +439,27 @@ def run_pipeline(query, model="gemma3:4b"):  # Default to Gemma 3 4B
                 "model_used": model
             }
         }
+        if query_embedding is not None:
+            _pipeline_cache(model).put(query_embedding, result)
+        return result
         
     except Exception as e:
-        print(f"❌ [DEBUG] Pipeline failed with error: {e}")
-        print(f"🔍 [DEBUG] Error type: {type(e).__name__}")
-        import traceback
-        print(f"📋 [DEBUG] Full traceback:")
-        traceback.print_exc()
-        
         # If any step fails, return error info with fallback
         error_msg = f"Pipeline failed at step {len(steps) + 1}: {str(e)}"
-        print(f"⚠️ [DEBUG] {error_msg}")
+        logger.exception(error_msg)
         
         # If we have some completed steps, try to provide a partial result
         if steps:
-            print(f"🔄 [DEBUG] Attempting to generate partial result from {len(steps)} completed steps...")
+            logger.debug("Attempting to generate partial result from %d completed steps", len(steps))
             try:
-                partial_context = f"Query: {query}\n\nContext: {context}\n\n"
-                for step in steps:
-                    partial_context += f"\n{step['name']}:\n{step['output']}\n"
+                parts = [f"Query: {query}", f"Context: {context}"]
+                parts.extend(f"{step['name']}:\n{step['output']}" for step in steps)
+                partial_context = "\n\n".join(parts)
                 
                 # Generate a simple summary
                 fallback_prompt = f"Based on the following completed research steps, provide a summary of what was accomplished:\n\n{partial_context}"
-                print(f"📝 [DEBUG] Generating fallback response...")
-                fallback_response = generate(fallback_prompt, "You are a research assistant. Provide a clear summary of the completed research steps.", model)
-                print(f"✅ [DEBUG] Fallback response generated ({len(fallback_response)} characters)")
+                fallback_response = await agenerate(fallback_prompt, "You are a research assistant. Provide a clear summary of the completed research steps.", model)
+                logger.debug("Fallback response generated (%d characters)", len(fallback_response))
                 
                 return {
                     "answer": f"⚠️ Pipeline partially completed. Here's what was accomplished:\n\n{fallback_response}",
@@ -235,8 +471,7 @@ def run_pipeline(query, model="gemma3:4b"):  # Default to Gemma 3 4B
                     "total_steps": len(steps)
                 }
             except Exception as fallback_error:
-                print(f"❌ [DEBUG] Fallback generation also failed: {fallback_error}")
-                pass
+                logger.error("Fallback generation also failed: %s", fallback_error)
         
         # If all else fails, return basic error info
         return {
@@ -248,6 +483,14 @@ def run_pipeline(query, model="gemma3:4b"):  # Default to Gemma 3 4B
             "error": error_msg,
             "total_steps": 0
         }
+    
+    finally:
+        for task in prefill_tasks:
+            task.cancel()
+
+def run_pipeline(query, model="gemma3:4b"):  # Default to Gemma 3 4B
+    """Run the multi-agent pipeline for comprehensive research analysis"""
+    return asyncio.run(arun_pipeline(query, model))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -0,0 +1,137 @@
+"""
+Semantic cache for AI Research Assistant
+Maps query embeddings to results so near-duplicate questions reuse an earlier answer
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+class SemanticCache:
+    """Thread-safe LRU+TTL cache looked up by cosine similarity of embeddings
+
+    A lookup hits when the closest cached embedding has similarity >= threshold.
+    Inserting an embedding within dedup_threshold of an existing key replaces that
+    entry instead of adding a near-copy. Keys are L2-normalized and searched with a
+    FAISS inner-product index when FAISS is installed, numpy otherwise.
+    """
+
+    # Nearest keys examined per lookup
+    SEARCH_K = 8
+
+    def __init__(self, threshold: float = 0.85, dedup_threshold: float = 0.95,
+                 capacity: int = 256, ttl: float = 300):
+        self.threshold = threshold
+        self.dedup_threshold = dedup_threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        # entry id -> (normalized embedding, value, expires_at), least recently used first
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, Any, float]]" = OrderedDict()
+        self._index = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vec: Sequence[float]) -> np.ndarray:
+        q = np.asarray(vec, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(q)
+        return q / norm if norm > 0 else q
+
+    def _neighbours(self, q: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Ids and similarities of up to k closest cached keys, most similar first"""
+        k = min(k, len(self._entries))
+        if not k:
+            return []
+        if self._index is not None:
+            scores, ids = self._index.search(q[None, :], k)
+            return [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i != -1]
+        ids = list(self._entries)
+        scores = np.stack([self._entries[i][0] for i in ids]) @ q
+        top = np.argsort(-scores)[:k]
+        return [(ids[j], float(scores[j])) for j in top]
+
+    def _nearest(self, q: np.ndarray) -> Tuple[Optional[int], float]:
+        """Id and similarity of the closest cached key (None when empty)"""
+        neighbours = self._neighbours(q, 1)
+        return neighbours[0] if neighbours else (None, -1.0)
+
+    def _remove(self, entry_id: int) -> None:
+        del self._entries[entry_id]
+        if self._index is not None:
+            self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    def get(self, vec: Sequence[float], threshold: Optional[float] = None) -> Optional[Any]:
+        """Return the value cached under the most similar live embedding, or None
+
+        The closest SEARCH_K keys are checked, so an expired nearest entry doesn't hide a
+        live one above the threshold; expired entries met on the way are removed.
+        """
+        q = self._normalize(vec)
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            now = time.monotonic()
+            for entry_id, score in self._neighbours(q, self.SEARCH_K):
+                if score < threshold:
+                    break
+                _, value, expires_at = self._entries[entry_id]
+                if expires_at < now:
+                    self._remove(entry_id)
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            return None
+
+    def put(self, vec: Sequence[float], value: Any) -> None:
+        """Cache value under an embedding, evicting the least recently used entry when full"""
+        q = self._normalize(vec)
+        with self._lock:
+            entry_id, score = self._nearest(q)
+            if entry_id is not None and score >= self.dedup_threshold:
+                self._remove(entry_id)
+
+            if FAISS_AVAILABLE and self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(q.shape[0]))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (q, value, time.monotonic() + self.ttl)
+            if self._index is not None:
+                self._index.add_with_ids(q[None, :], np.array([entry_id], dtype=np.int64))
+
+            while len(self._entries) > self.capacity:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Drop every entry (hit/miss counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            if self._index is not None:
+                self._index.reset()
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit-rate statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "ttl_seconds": self.ttl,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -9,6 +9,12 @@ import os
 import yaml
 from pathlib import Path
 
+# Prefer libyaml's C dumper; fall back to the pure-Python one when PyYAML was built without it
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
 # Add the parent directory to the path so we can import app modules
 sys.path.append(str(Path(__file__).parent.parent))
 
@@ -129,7 +135,7 @@ def create_sample_config():
                 }
             ],
             "behavior": {
-                "parallel_processing": False,
+                "parallel_processing": True,
                 "error_handling": "stop_on_error",
                 "retry_attempts": 1,
                 "progress_reporting": True,
@@ -142,7 +148,7 @@ def create_sample_config():
     config_path.parent.mkdir(exist_ok=True)
     
     with open(config_path, 'w', encoding='utf-8') as file:
-        yaml.dump(sample_config, file, default_flow_style=False, indent=2, allow_unicode=True)
+        yaml.dump(sample_config, file, Dumper=SafeDumper, default_flow_style=False, indent=2, allow_unicode=True)
     
     print(f"✅ Sample configuration created at {config_path}")
 